@@ -1,11 +1,18 @@
 """AI advisor for assumptions and narratives."""
 from __future__ import annotations
 
+import hashlib
 import json
+import logging
+import math
 import os
-from typing import Dict, List
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Dict, List, Optional, Tuple
 
-import numpy as np
+logger = logging.getLogger(__name__)
 
 
 def build_recommendations(profile: Dict[str, str], history: Dict[str, float]) -> Dict[str, object]:
@@ -15,7 +22,12 @@ def build_recommendations(profile: Dict[str, str], history: Dict[str, float]) ->
         base_growth = 0.12
     elif "turnaround" in stage:
         base_growth = 0.04
-    margin = history.get("gross_margin", 0.45)
+    historical_growth = history.get("revenue_cagr")
+    if historical_growth is not None and math.isfinite(historical_growth):
+        base_growth = round(0.5 * base_growth + 0.5 * min(max(historical_growth, -0.1), 0.3), 4)
+    margin = history.get("gross_margin")
+    if margin is None or not math.isfinite(margin):
+        margin = 0.45
     wacc = 0.09 if profile.get("size", "mid").lower() in {"large", "mega"} else 0.11
 
     recommendations = {
@@ -53,20 +65,131 @@ def build_recommendations(profile: Dict[str, str], history: Dict[str, float]) ->
     }
 
 
-def ai_enhance_recommendations(base_payload: Dict[str, object]) -> Dict[str, object]:
+class EnhancementCache:
+    """Thread-safe TTL cache of enhanced payloads keyed by base payload hash."""
+
+    def __init__(self, ttl_seconds: float = 3600.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Dict[str, object]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return payload
+
+    def put(self, key: str, payload: Dict[str, object]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+ENHANCE_TIMEOUT = 8.0
+# HTTP timeout of the background request. It is longer than the latency budget
+# so answers that miss the budget still land in the cache for the next run.
+ENHANCE_REQUEST_TIMEOUT = 60.0
+ENHANCE_MODEL = "gpt-4o-mini"
+
+enhancement_cache = EnhancementCache()
+_executor: Optional[ThreadPoolExecutor] = None
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def payload_key(payload: Dict[str, object]) -> str:
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _request_enhancement(base_payload: Dict[str, object], api_key: str, timeout: float) -> Dict[str, object]:
+    import openai
+
+    # OPENAI_BASE_URL lets tests and local setups point the client at a stub endpoint.
+    client = openai.OpenAI(
+        api_key=api_key,
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        timeout=timeout,
+        max_retries=0,
+    )
+    prompt = (
+        "Enhance these valuation recommendations with concise rationales."
+        " Return JSON only.\n" + json.dumps(base_payload)
+    )
+    response = client.responses.create(model=ENHANCE_MODEL, input=prompt)
+    enhanced = json.loads(response.output_text)
+    if not isinstance(enhanced, dict):
+        raise ValueError("AI advisor returned non-object JSON.")
+    return enhanced
+
+
+def _enhance_job(key: str, base_payload: Dict[str, object], api_key: str, timeout: float) -> Dict[str, object]:
+    enhanced = base_payload
+    try:
+        enhanced = _request_enhancement(base_payload, api_key, timeout)
+        # Cache before leaving the in-flight table, so a concurrent submission
+        # always finds one of the two and never sends a duplicate request.
+        enhancement_cache.put(key, enhanced)
+    except Exception as exc:
+        logger.warning("AI enhancement failed, using deterministic recommendations: %s", exc)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+    return enhanced
+
+
+def submit_enhancement(base_payload: Dict[str, object], request_timeout: float = ENHANCE_REQUEST_TIMEOUT) -> Future:
+    """Start enhancing ``base_payload`` in the background.
+
+    The returned future never raises: it resolves to the enhanced payload, or to
+    ``base_payload`` when no API key is set or the call fails or times out.
+    Concurrent submissions of the same payload share one request.
+    """
+    global _executor
+    key = payload_key(base_payload)
+    cached = enhancement_cache.get(key)
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return base_payload
+    if cached is not None or not api_key:
+        done: Future = Future()
+        done.set_result(cached if cached is not None else base_payload)
+        return done
+    with _inflight_lock:
+        if key in _inflight:
+            return _inflight[key]
+        # The job may have cached its answer and left _inflight since the check above.
+        cached = enhancement_cache.get(key)
+        if cached is not None:
+            done = Future()
+            done.set_result(cached)
+            return done
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-advisor")
+        future = _executor.submit(_enhance_job, key, base_payload, api_key, request_timeout)
+        _inflight[key] = future
+    return future
+
+
+def ai_enhance_recommendations(
+    base_payload: Dict[str, object],
+    timeout: float = ENHANCE_TIMEOUT,
+    request_timeout: float = ENHANCE_REQUEST_TIMEOUT,
+) -> Dict[str, object]:
+    """Enhanced recommendations within ``timeout`` seconds, else ``base_payload``.
+
+    A call that misses the budget keeps running for up to ``request_timeout``
+    seconds and its result is cached, so a later call with the same payload
+    returns it immediately.
+    """
+    future = submit_enhancement(base_payload, request_timeout=request_timeout)
     try:
-        import openai
-
-        client = openai.OpenAI(api_key=api_key)
-        prompt = (
-            "Enhance these valuation recommendations with concise rationales."
-            " Return JSON only.\n" + json.dumps(base_payload)
-        )
-        response = client.responses.create(model="gpt-4o-mini", input=prompt)
-        content = response.output_text
-        return json.loads(content)
-    except Exception:
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
         return base_payload
@@ -4,23 +4,33 @@ from __future__ import annotations
 import json
 from io import BytesIO
 
-import pandas as pd
 import streamlit as st
 
-from ai_advisor import ai_enhance_recommendations, build_recommendations
-from forecast import build_ufcf, forecast_statements
-from normalize import canonicalize_long_format, map_facts_to_statements
-from report import generate_report
-from sec_ingest import (
-    build_ticker_index,
-    flatten_company_facts,
-    get_company_facts_by_ticker,
-    load_ticker_cik_mapping,
-    search_tickers,
-)
-from valuation_comps import CompInput, comps_valuation
-from valuation_dcf import DCFInputs, dcf_valuation, terminal_value_exit_multiple
-from sensitivity import dcf_sensitivity
+# pandas, the model modules, SEC ingestion (requests/tenacity), the advisor and
+# the Excel report are imported where they are first needed, so a page view
+# that has not loaded any data only pays for Streamlit.
+
+
+@st.cache_resource
+def _metrics_store():
+    """One metrics store per server process, shared by every session."""
+    from metrics import MetricsStore
+
+    return MetricsStore()
+
+
+# Seconds between checks for the AI-enhanced recommendations while they are pending.
+ADVISOR_POLL_SECONDS = 1.0
+
+
+def _advisor_panel(enhancement, recs) -> None:
+    """Deterministic recommendations until the background enhancement resolves, then its result."""
+    if enhancement.done():
+        st.json(enhancement.result())
+    else:
+        st.json(recs)
+        st.caption("Waiting for the AI advisor; the enhanced recommendations replace these when they arrive.")
+
 
 st.set_page_config(page_title="AI-Assisted Valuation", layout="wide")
 
@@ -46,26 +56,29 @@ profile = {
 st.subheader("1) Data Input")
 mode = st.radio("Input mode", ["Ticker Search", "Upload Excel"], horizontal=True)
 
-historicals = pd.DataFrame()
+historicals = None
 company_summary = {}
-source_trace = pd.DataFrame()
+source_trace = None
 
 if mode == "Ticker Search":
     ticker_query = st.text_input("Search ticker", "AAPL")
     if st.button("Load SEC Data"):
-        mapping = load_ticker_cik_mapping()
-        index = build_ticker_index(mapping)
-        matches = search_tickers(index, ticker_query)
+        from normalize import canonicalize_long_format
+        from shared_data import load_shared_company_facts, search_ticker_table, shared_ticker_table
+
+        # The ticker table and published normalized facts are memory-mapped and
+        # shared by every session on this host; a company loaded for the first
+        # time is stored and published for the next session.
+        matches = search_ticker_table(shared_ticker_table(), ticker_query)
         if not matches:
             st.error("No matching tickers found.")
         else:
-            ticker = matches[0].ticker
-            profile_info, facts = get_company_facts_by_ticker(ticker)
-            flat = flatten_company_facts(facts)
-            mapped = map_facts_to_statements(flat)
+            profile_info = matches[0]
+            mapped = load_shared_company_facts(profile_info.cik)
             historicals = canonicalize_long_format(mapped)
             source_trace = mapped
             company_summary = {
+                "cik": profile_info.cik,
                 "ticker": profile_info.ticker,
                 "name": profile_info.title,
                 "source": "SEC Company Facts",
@@ -75,28 +88,75 @@ if mode == "Ticker Search":
 else:
     uploaded = st.file_uploader("Upload historicals (.xlsx)", type=["xlsx"])
     if uploaded:
-        df = pd.read_excel(uploaded)
-        historicals = df
-        company_summary = {"ticker": "Uploaded", "name": "Custom", "source": "User Excel"}
-        st.dataframe(historicals.head(20))
+        from upload_ingest import ingest_workbook
+
+        try:
+            historicals = ingest_workbook(uploaded)
+        except ValueError as exc:
+            st.error(str(exc))
+        else:
+            company_summary = {"ticker": "Uploaded", "name": "Custom", "source": "User Excel"}
+            st.dataframe(historicals.head(20))
+
+if historicals is not None and not historicals.empty:
+    import pandas as pd
+
+    from forecast import build_ufcf, forecast_statements, next_forecast_years
+    from metrics import compute_history_metrics
+    from sensitivity import dcf_sensitivity, dcf_sensitivity_adaptive
+    from valuation_comps import CompInput, comps_valuation
+    from valuation_dcf import DCFInputs, dcf_valuation, terminal_value_exit_multiple
+
+    if source_trace is None:
+        source_trace = pd.DataFrame()
+
+    # SEC companies read persisted metrics (recomputed only when their history changes);
+    # uploads are computed on the fly.
+    if company_summary.get("cik"):
+        history_metrics = _metrics_store().get_or_compute(company_summary["cik"], historicals)
+    else:
+        history_metrics = compute_history_metrics(historicals).iloc[0].to_dict()
+    historical_growth = history_metrics.get("revenue_cagr")
+    default_growth = 0.06
+    if historical_growth is not None and pd.notna(historical_growth):
+        default_growth = round(min(max(float(historical_growth), -0.1), 0.3), 2)
 
-if not historicals.empty:
     st.subheader("2) Forecasting")
     forecast_years = st.number_input("Forecast years", min_value=3, max_value=10, value=5)
-    revenue_growth = st.slider("Base revenue growth", min_value=-0.1, max_value=0.3, value=0.06, step=0.01)
+    revenue_growth = st.slider(
+        "Base revenue growth", min_value=-0.1, max_value=0.3, value=default_growth, step=0.01
+    )
 
     assumptions = {"revenue_growth": {"path": [revenue_growth] * int(forecast_years)}}
 
     if st.button("Run Forecast"):
-        result = forecast_statements(historicals, list(range(2024, 2024 + int(forecast_years))), assumptions)
+        from result_cache import DCF, FORECAST, SENSITIVITY, ResultCache
+
+        # Repeat runs with the same historicals, assumptions and model code load from disk.
+        result_cache = ResultCache()
+        cache_scope = {"cik": company_summary.get("cik"), "label": company_summary.get("ticker")}
+        years = next_forecast_years(historicals, int(forecast_years))
+        result = result_cache.get_or_compute(
+            FORECAST,
+            lambda: forecast_statements(historicals, years, assumptions),
+            historicals=historicals,
+            years=years,
+            assumptions=assumptions,
+            **cache_scope,
+        )
         combined = pd.concat([historicals, result.forecast], ignore_index=True)
         st.dataframe(result.forecast.head(20))
 
         st.subheader("3) AI Advisor")
-        history_metrics = {"gross_margin": 0.45}
+        from ai_advisor import build_recommendations, submit_enhancement
+
         recs = build_recommendations(profile, history_metrics)
-        recs = ai_enhance_recommendations(recs)
-        st.json(recs)
+        # Show the deterministic recommendations now. While the enhancement is
+        # pending the panel reruns on its own as a fragment and swaps it in;
+        # the script thread never waits on the request.
+        enhancement = submit_enhancement(recs)
+        advisor_run_every = None if enhancement.done() else ADVISOR_POLL_SECONDS
+        st.fragment(_advisor_panel, run_every=advisor_run_every)(enhancement, recs)
 
         st.subheader("4) Valuation")
         tax_rate = st.slider("Tax rate", min_value=0.05, max_value=0.4, value=0.21, step=0.01)
@@ -115,7 +175,7 @@ if not historicals.empty:
             cash=0.0,
             shares=1.0,
         )
-        dcf_result = dcf_valuation(dcf_inputs)
+        dcf_result = result_cache.get_or_compute(DCF, lambda: dcf_valuation(dcf_inputs), inputs=dcf_inputs, **cache_scope)
         st.metric("DCF Share Price", f"{dcf_result.share_price:,.2f}")
 
         peers = [CompInput(peer="PEER1", multiple_type="EV/EBITDA", multiple=10.0)]
@@ -123,17 +183,45 @@ if not historicals.empty:
         st.metric("Comps EV", f"{comps_result.implied_value:,.0f}")
 
         st.subheader("5) Sensitivity")
-        grid = dcf_sensitivity(
-            dcf_inputs,
-            wacc_range=(wacc - 0.02, wacc + 0.02),
-            terminal_range=(terminal_multiple - 2, terminal_multiple + 2),
-            size=7,
-            terminal_method="exit_multiple",
-        )
+        wacc_range = (wacc - 0.02, wacc + 0.02)
+        terminal_range = (terminal_multiple - 2, terminal_multiple + 2)
+        # Every argument of the grid call is also a key input, so no parameter can change unseen.
+        sensitivity_params = {
+            "wacc_range": wacc_range,
+            "terminal_range": terminal_range,
+            "terminal_method": "exit_multiple",
+            "metric": "share_price",
+        }
+        if st.checkbox("Adaptive refinement", value=False):
+            adaptive_params = {**sensitivity_params, "dense_size": 21}
+            adaptive = result_cache.get_or_compute(
+                SENSITIVITY,
+                lambda: dcf_sensitivity_adaptive(dcf_inputs, **adaptive_params),
+                inputs=dcf_inputs,
+                adaptive=True,
+                **adaptive_params,
+                **cache_scope,
+            )
+            grid = adaptive.dense
+            st.caption(f"Interpolated from {adaptive.evaluations} DCF evaluations.")
+        else:
+            grid_params = {**sensitivity_params, "size": 7}
+            grid = result_cache.get_or_compute(
+                SENSITIVITY,
+                lambda: dcf_sensitivity(dcf_inputs, **grid_params),
+                inputs=dcf_inputs,
+                adaptive=False,
+                **grid_params,
+                **cache_scope,
+            )
+        result_cache.close()
         sens_df = pd.DataFrame(grid.grid, index=grid.x_values, columns=grid.y_values)
         st.dataframe(sens_df)
 
         st.subheader("6) Export Excel")
+        from export_columnar import compact_source_trace, export_run
+        from report import generate_report
+
         output = BytesIO()
         statements = {
             "Income Statement": combined[combined["statement"] == "IS"],
@@ -145,6 +233,8 @@ if not historicals.empty:
             "Valuation – Comps": pd.DataFrame([comps_result.stats]),
         }
         diagnostics = {"plugs": result.diagnostics.get("plugs", [])}
+        if enhancement.done():
+            recs = enhancement.result()
         generate_report(
             output_path="/tmp/model.xlsx",
             company_summary=company_summary,
@@ -153,7 +243,19 @@ if not historicals.empty:
             valuation_tables=valuation_tables,
             sensitivity_df=sens_df.reset_index(),
             diagnostics=diagnostics,
-            source_trace=source_trace if not source_trace.empty else pd.DataFrame(),
+            source_trace=compact_source_trace(source_trace) if not source_trace.empty else pd.DataFrame(),
         )
         with open("/tmp/model.xlsx", "rb") as f:
             st.download_button("Download Excel", f, file_name="valuation_model.xlsx")
+        export_run(
+            "/tmp/model_run",
+            statements=combined,
+            forecast=result.forecast,
+            ufcf=ufcf_df,
+            sensitivity_df=sens_df,
+            valuation_tables=valuation_tables,
+            source_trace=source_trace,
+            company_summary=company_summary,
+        )
+        st.caption("Parquet tables with source lineage written to /tmp/model_run.")
+
@@ -1,7 +1,7 @@
 """Line item classification into driver families."""
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Optional
 
 
 DRIVER_FAMILIES = {
@@ -25,6 +25,20 @@ DRIVER_FAMILIES = {
 }
 
 
+# Forecast method per driver family: "rule" keeps the deterministic drivers in
+# forecast.py, "damped_trend" and "log_linear" fit statistical curves to history.
+FORECAST_METHODS = ("rule", "damped_trend", "log_linear")
+
+DEFAULT_FAMILY_METHODS = {family: "rule" for family in set(DRIVER_FAMILIES.values()) | {"other"}}
+
+
+def select_forecast_method(driver_family: str, overrides: Optional[Dict[str, str]] = None) -> str:
+    method = (overrides or {}).get(driver_family, DEFAULT_FAMILY_METHODS.get(driver_family, "rule"))
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Unknown forecast method {method!r} for {driver_family}.")
+    return method
+
+
 def classify_line_item(line_item: str) -> str:
     return DRIVER_FAMILIES.get(line_item, "other")
 
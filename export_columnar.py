@@ -0,0 +1,159 @@
+"""Parquet export of a model run with compact source lineage."""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from classify import classify_line_item
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Line items whose forecast is driven by revenue in forecast_statements.
+_REVENUE_LINKED = {"revenue-driven", "margin-driven", "working-capital"}
+
+# UFCF components and the forecast line items build_ufcf derives them from.
+UFCF_SOURCES = {
+    "NOPAT": ["Operating income", "Revenue"],
+    "D&A": ["D&A", "Revenue"],
+    "Capex": ["Capex", "Revenue"],
+    "Delta NWC": [],
+    "UFCF": ["NOPAT", "D&A", "Capex", "Delta NWC"],
+}
+
+FACT_REFERENCE_COLUMNS = ["fact_id", "accn", "tag", "unit", "start", "end", "fy", "fp", "frame"]
+
+LINEAGE_COLUMNS = ["artifact", "line_item", "year", "source_artifact", "source_line_item", "fact_id"]
+
+
+def facts_reference(source_trace: pd.DataFrame) -> pd.DataFrame:
+    """One row per SEC fact used, no values.
+
+    ``fact_id`` is the stable id from ``normalize.fact_ids``; accession, tag and
+    the period columns identify the fact in companyfacts on their own.
+    """
+    if source_trace.empty or "fact_id" not in source_trace.columns:
+        columns = {"fact_id": pd.Series(dtype="int64")}
+        columns.update({col: pd.Series(dtype=str) for col in FACT_REFERENCE_COLUMNS[1:]})
+        return pd.DataFrame(columns)
+    facts = source_trace.rename(columns={"source_tag": "tag", "year": "fy"}).reindex(columns=FACT_REFERENCE_COLUMNS)
+    return facts.drop_duplicates("fact_id").sort_values("fact_id").reset_index(drop=True)
+
+
+def build_lineage(source_trace: pd.DataFrame, forecast: pd.DataFrame, ufcf: pd.DataFrame) -> pd.DataFrame:
+    """Edges from each output back to its inputs.
+
+    Historical statement cells point at fact ids; forecast line items and UFCF
+    components point at the line items they were derived from (``year`` is
+    null when an edge covers every year). Valuation and sensitivity results
+    point at the UFCF row.
+    """
+    frames: List[pd.DataFrame] = []
+    if not source_trace.empty and "fact_id" in source_trace.columns:
+        frames.append(
+            pd.DataFrame(
+                {
+                    "artifact": "statements",
+                    "line_item": source_trace["line_item"],
+                    "year": source_trace["year"],
+                    "source_artifact": "facts",
+                    "source_line_item": None,
+                    "fact_id": source_trace["fact_id"].astype("Int64"),
+                }
+            )
+        )
+
+    edges: List[dict] = []
+    for line_item in forecast["line_item"].unique():
+        sources = [line_item]
+        if line_item != "Revenue" and classify_line_item(line_item) in _REVENUE_LINKED:
+            sources.append("Revenue")
+        edges.extend(
+            {"artifact": "forecast", "line_item": line_item, "source_artifact": "statements", "source_line_item": src}
+            for src in sources
+        )
+    for component, sources in UFCF_SOURCES.items():
+        for src in sources:
+            artifact = "ufcf" if src in UFCF_SOURCES else "forecast"
+            edges.append({"artifact": "ufcf", "line_item": component, "source_artifact": artifact, "source_line_item": src})
+    for artifact in ("valuation", "sensitivity"):
+        edges.append({"artifact": artifact, "line_item": None, "source_artifact": "ufcf", "source_line_item": "UFCF"})
+    # Fact ids use the full int64 range; keep them nullable-integer so NaN padding cannot round them.
+    frames.append(pd.DataFrame(edges).assign(fact_id=pd.array([pd.NA] * len(edges), dtype="Int64")))
+
+    lineage = pd.concat(frames, ignore_index=True).reindex(columns=LINEAGE_COLUMNS)
+    lineage["year"] = pd.to_numeric(lineage["year"], errors="coerce").astype("Int64")
+    lineage["fact_id"] = lineage["fact_id"].astype("Int64")
+    return lineage
+
+
+def sensitivity_long(sensitivity_df: pd.DataFrame, x_name: str = "wacc", y_name: str = "terminal") -> pd.DataFrame:
+    """Grid frame (index = x values, columns = y values) as tidy ``x, y, value`` rows."""
+    values = sensitivity_df.to_numpy(dtype=float)
+    x = np.repeat(np.asarray(sensitivity_df.index, dtype=float), values.shape[1])
+    y = np.tile(np.asarray(sensitivity_df.columns, dtype=float), values.shape[0])
+    return pd.DataFrame({x_name: x, y_name: y, "value": values.ravel()})
+
+
+def export_run(
+    directory: str,
+    statements: pd.DataFrame,
+    forecast: pd.DataFrame,
+    ufcf: pd.DataFrame,
+    sensitivity_df: pd.DataFrame,
+    valuation_tables: Dict[str, pd.DataFrame],
+    source_trace: pd.DataFrame,
+    company_summary: Optional[Dict[str, str]] = None,
+) -> Dict[str, Path]:
+    """Write each run table as Parquet under ``directory``; returns table name -> path."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out_dir = Path(directory)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    metadata = {
+        "company_summary": company_summary or {},
+        "timestamp": datetime.utcnow().isoformat(),
+        "model_version": "1.0",
+    }
+    valuation = pd.concat(
+        [df.assign(table=name) for name, df in valuation_tables.items()], ignore_index=True
+    ) if valuation_tables else pd.DataFrame()
+    tables = {
+        "statements": statements.drop(columns=["source_taxonomy"], errors="ignore"),
+        "forecast": forecast,
+        "ufcf": ufcf.rename_axis("year").reset_index(),
+        "sensitivity": sensitivity_long(sensitivity_df),
+        "valuation": valuation,
+        "facts": facts_reference(source_trace),
+        "lineage": build_lineage(source_trace, forecast, ufcf),
+    }
+    paths: Dict[str, Path] = {}
+    for name, df in tables.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        run_metadata = {b"valuation_run": json.dumps(metadata, default=str).encode()}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **run_metadata})
+        path = out_dir / f"{name}.parquet"
+        pq.write_table(table, path, compression="zstd", use_dictionary=True)
+        paths[name] = path
+    return paths
+
+
+def read_run(directory: str) -> Dict[str, "pa.Table"]:
+    """Memory-mapped Arrow tables for every Parquet file of an exported run."""
+    import pyarrow.parquet as pq
+
+    return {path.stem: pq.read_table(path, memory_map=True) for path in sorted(Path(directory).glob("*.parquet"))}
+
+
+def compact_source_trace(source_trace: pd.DataFrame) -> pd.DataFrame:
+    """Source trace for the workbook: line item, year and fact reference, without repeating values."""
+    columns = [
+        col for col in ("line_item", "year", "source_tag", "accn", "start", "end", "fact_id") if col in source_trace.columns
+    ]
+    return source_trace[columns]
@@ -0,0 +1,184 @@
+"""Embedded SQLite store for flattened SEC facts across many companies."""
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+FACT_COLUMNS = [
+    "cik",
+    "taxonomy",
+    "tag",
+    "unit",
+    "value",
+    "fy",
+    "fp",
+    "form",
+    "filed",
+    "end",
+    "start",
+    "accn",
+    "frame",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    cik TEXT NOT NULL,
+    taxonomy TEXT,
+    tag TEXT NOT NULL,
+    unit TEXT,
+    value REAL,
+    fy INTEGER,
+    fp TEXT,
+    form TEXT,
+    filed TEXT,
+    "end" TEXT,
+    start TEXT,
+    accn TEXT,
+    frame TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_facts_cik_tag_fy ON facts (cik, tag, fy);
+CREATE INDEX IF NOT EXISTS idx_facts_tag_frame ON facts (tag, frame);
+CREATE INDEX IF NOT EXISTS idx_facts_tag_fy ON facts (tag, fy);
+CREATE INDEX IF NOT EXISTS idx_facts_frame ON facts (frame);
+CREATE INDEX IF NOT EXISTS idx_facts_cik_accn ON facts (cik, accn);
+CREATE TABLE IF NOT EXISTS company_versions (
+    cik TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+def default_store_path() -> Path:
+    return Path(".cache") / "facts.sqlite"
+
+
+class FactsStore:
+    """Indexed facts table keyed by cik, tag, fiscal year and frame."""
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path is not None else default_store_path()
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "FactsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def replace_company(self, cik: str, flat: pd.DataFrame) -> int:
+        """Replace every stored fact for ``cik`` with the rows of ``flat``."""
+        rows = _to_rows(cik, flat)
+        with self._conn:
+            self._conn.execute("DELETE FROM facts WHERE cik = ?", (cik,))
+            self._conn.executemany(_INSERT_SQL, rows)
+            self._bump_version(cik)
+        return len(rows)
+
+    def insert_facts(self, cik: str, flat: pd.DataFrame) -> int:
+        rows = _to_rows(cik, flat)
+        if not rows:
+            return 0
+        with self._conn:
+            self._conn.executemany(_INSERT_SQL, rows)
+            self._bump_version(cik)
+        return len(rows)
+
+    def _bump_version(self, cik: str) -> None:
+        self._conn.execute(
+            "INSERT INTO company_versions (cik, version) VALUES (?, 1) "
+            "ON CONFLICT(cik) DO UPDATE SET version = version + 1",
+            (cik,),
+        )
+
+    def company_version(self, cik: str) -> int:
+        """Counter bumped on every write for ``cik``; 0 when the company is unknown."""
+        cur = self._conn.execute("SELECT version FROM company_versions WHERE cik = ?", (cik,))
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+    def company_versions(self) -> Dict[str, int]:
+        """Write counters of every stored company, keyed by cik."""
+        cur = self._conn.execute("SELECT cik, version FROM company_versions ORDER BY cik")
+        return {cik: int(version) for cik, version in cur.fetchall()}
+
+    def accessions(self, cik: str) -> Dict[str, str]:
+        """Stored accession numbers for ``cik`` mapped to their latest ``filed`` date."""
+        cur = self._conn.execute(
+            "SELECT accn, MAX(filed) FROM facts WHERE cik = ? AND accn IS NOT NULL GROUP BY accn", (cik,)
+        )
+        return {accn: filed for accn, filed in cur.fetchall()}
+
+    def has_company(self, cik: str) -> bool:
+        cur = self._conn.execute("SELECT 1 FROM facts WHERE cik = ? LIMIT 1", (cik,))
+        return cur.fetchone() is not None
+
+    def companies(self) -> List[str]:
+        cur = self._conn.execute("SELECT DISTINCT cik FROM facts ORDER BY cik")
+        return [row[0] for row in cur.fetchall()]
+
+    def load_company(
+        self,
+        cik: str,
+        tags: Optional[Iterable[str]] = None,
+        years: Optional[Iterable[int]] = None,
+    ) -> pd.DataFrame:
+        """Return the flattened facts for one company, optionally filtered."""
+        clauses = ["cik = ?"]
+        params: List[object] = [cik]
+        _add_in_clause(clauses, params, "tag", tags)
+        _add_in_clause(clauses, params, "fy", years)
+        return self._select(" AND ".join(clauses), params)
+
+    def load_frame(self, frame: str, tags: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Cross-sectional scan: every filer's facts for a calendar ``frame`` (e.g. ``CY2023``)."""
+        clauses = ["frame = ?"]
+        params: List[object] = [frame]
+        _add_in_clause(clauses, params, "tag", tags)
+        return self._select(" AND ".join(clauses), params)
+
+    def load_fiscal_year(self, fy: int, tags: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        clauses = ["fy = ?"]
+        params: List[object] = [int(fy)]
+        _add_in_clause(clauses, params, "tag", tags)
+        return self._select(" AND ".join(clauses), params)
+
+    def _select(self, where: str, params: List[object]) -> pd.DataFrame:
+        columns = ", ".join(f'"{col}"' for col in FACT_COLUMNS)
+        cur = self._conn.execute(f"SELECT {columns} FROM facts WHERE {where}", params)
+        return pd.DataFrame(cur.fetchall(), columns=FACT_COLUMNS)
+
+
+_INSERT_SQL = "INSERT INTO facts ({}) VALUES ({})".format(
+    ", ".join(f'"{col}"' for col in FACT_COLUMNS), ", ".join("?" for _ in FACT_COLUMNS)
+)
+
+
+def _add_in_clause(clauses: List[str], params: List[object], column: str, values: Optional[Iterable]) -> None:
+    if values is None:
+        return
+    values = list(values)
+    if not values:
+        clauses.append("0")
+        return
+    clauses.append(f'"{column}" IN ({", ".join("?" for _ in values)})')
+    params.extend(values)
+
+
+def _to_rows(cik: str, flat: pd.DataFrame) -> List[tuple]:
+    if flat.empty:
+        return []
+    df = flat.reindex(columns=FACT_COLUMNS).copy()
+    df["cik"] = cik
+    df["fy"] = pd.to_numeric(df["fy"], errors="coerce").astype("Int64")
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
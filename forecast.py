@@ -2,13 +2,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
-from classify import classify_line_item
+from classify import classify_line_item, select_forecast_method
 from parse import safe_divide
+from stat_forecast import forecast_panel
 
 
 @dataclass
@@ -27,43 +28,95 @@ def _latest_value(series: pd.Series) -> float:
     return float(series.iloc[-1]) if not series.empty else 0.0
 
 
+def _latest_year(series: pd.Series, default: int) -> int:
+    series = series.dropna()
+    return int(series.index[-1]) if not series.empty else default
+
+
 def _ratio_to_revenue(line_values: pd.Series, revenue_series: pd.Series) -> float:
     return float(np.nanmedian(line_values / revenue_series))
 
 
-def build_revenue_path(last_revenue: float, growth_rates: List[float]) -> List[float]:
+def build_revenue_path(last_revenue: float, growth_rates: List[float], periods: Optional[List[int]] = None) -> List[float]:
+    """Compound ``last_revenue`` by each growth rate; ``periods`` gives the years each rate spans (default 1)."""
     revenues = []
     current = last_revenue
-    for growth in growth_rates:
-        current = current * (1 + growth)
+    for growth, span in zip(growth_rates, periods or [1] * len(growth_rates)):
+        current = current * (1 + growth) ** span
         revenues.append(current)
     return revenues
 
 
+def next_forecast_years(df: pd.DataFrame, count: int) -> List[int]:
+    """The ``count`` calendar years following the last historical year of ``df``."""
+    last_year = int(df["year"].max())
+    return list(range(last_year + 1, last_year + 1 + count))
+
+
 def forecast_statements(
     df: pd.DataFrame,
     forecast_years: List[int],
     assumptions: Dict[str, dict],
+    methods: Optional[Dict[str, str]] = None,
 ) -> ForecastResult:
+    """Forecast every line item; ``methods`` maps driver families to a method in ``FORECAST_METHODS``.
+
+    ``forecast_years`` are calendar years after the last historical year; both
+    the growth-rule and statistical paths place each value at its year, so
+    ``[2026, 2028]`` skips 2027 rather than treating 2028 as the next year.
+    Growth rate ``i`` of the revenue path applies to every year from the
+    previous forecast year up to ``forecast_years[i]``. Raises ``ValueError``
+    for years at or before the last historical year.
+    """
     df = df.copy()
     df["driver_family"] = df["line_item"].apply(classify_line_item)
-    hist_pivot = _historical_pivot(df)
+    hist_pivot = _historical_pivot(df).sort_index(axis=1)
     years = sorted(df["year"].unique())
 
+    chosen = {item: select_forecast_method(classify_line_item(item), methods) for item in hist_pivot.index}
+    # Statistical forecasts are indexed by years after the last historical year.
+    last_year = int(hist_pivot.columns.max()) if len(hist_pivot.columns) else 0
+    forecast_years = [int(year) for year in forecast_years]
+    covered = [year for year in forecast_years if year <= last_year]
+    if covered:
+        raise ValueError(f"Forecast years {covered} are not after the last historical year {last_year}.")
+    if sorted(set(forecast_years)) != forecast_years:
+        raise ValueError(f"Forecast years must be increasing and distinct, got {forecast_years}.")
+    steps = [year - last_year for year in forecast_years]
+    statistical = {}
+    for method in sorted(set(chosen.values()) - {"rule"}):
+        items = [item for item, picked in chosen.items() if picked == method]
+        statistical[method] = forecast_panel(hist_pivot.loc[items], method, max(steps, default=1))
+
+    def _statistical_value(line_item: str, step: int) -> Tuple[float, float, float]:
+        point, lower, upper = statistical[chosen[line_item]]
+        return point.at[line_item, step], lower.at[line_item, step], upper.at[line_item, step]
+
     revenue_hist = hist_pivot.loc["Revenue"] if "Revenue" in hist_pivot.index else pd.Series(dtype=float)
     last_revenue = _latest_value(revenue_hist)
     growth_path = assumptions.get("revenue_growth", {}).get("path", [0.05] * len(forecast_years))
-    revenue_fcst = build_revenue_path(last_revenue, growth_path)
+    # Compound from the year of the last reported revenue to each forecast year.
+    anchors = [_latest_year(revenue_hist, last_year), *forecast_years]
+    revenue_fcst = build_revenue_path(last_revenue, growth_path, [b - a for a, b in zip(anchors, anchors[1:])])
+    if chosen.get("Revenue", "rule") != "rule":
+        fitted = [_statistical_value("Revenue", step)[0] for step in steps]
+        revenue_fcst = [f if np.isfinite(f) else r for f, r in zip(fitted, revenue_fcst)]
 
     forecast_rows: List[dict] = []
 
     for line_item in hist_pivot.index:
         hist_values = hist_pivot.loc[line_item]
         driver = classify_line_item(line_item)
+        method = chosen[line_item]
         for idx, year in enumerate(forecast_years):
             value = None
+            lower = upper = np.nan
+            fitted = _statistical_value(line_item, steps[idx]) if method != "rule" else (np.nan, np.nan, np.nan)
             if line_item == "Revenue":
                 value = revenue_fcst[idx]
+                lower, upper = fitted[1], fitted[2]
+            elif np.isfinite(fitted[0]):
+                value, lower, upper = fitted
             elif driver in {"margin-driven", "revenue-driven"}:
                 ratio = _ratio_to_revenue(hist_values, revenue_hist)
                 value = ratio * revenue_fcst[idx]
@@ -83,7 +136,9 @@ def forecast_statements(
                     "line_item": line_item,
                     "year": year,
                     "value": float(value) if value is not None else 0.0,
-                    "forecast_method": driver,
+                    "forecast_method": driver if method == "rule" else f"{driver}:{method}",
+                    "lower": float(lower),
+                    "upper": float(upper),
                 }
             )
 
@@ -93,7 +148,10 @@ def forecast_statements(
 
     return ForecastResult(
         forecast=forecast_df,
-        assumptions_used={"revenue_growth": growth_path},
+        assumptions_used={
+            "revenue_growth": growth_path,
+            "methods": {item: method for item, method in chosen.items() if method != "rule"},
+        },
         diagnostics=diagnostics,
     )
 
@@ -0,0 +1,127 @@
+"""Measure cold import times and the startup cost saved by deferred imports.
+
+Usage::
+
+    python import_timing.py [module ...]
+
+Each module is imported in a fresh interpreter with ``-X importtime``. The
+"deferred" column is the extra time the same interpreter would spend if the
+dependencies that are now loaded on first use were still imported eagerly.
+``app`` is measured by running the Streamlit script's own module-level
+imports, which is what a cold page view pays for.
+"""
+from __future__ import annotations
+
+import ast
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Dependencies each module used to import at module level and now loads lazily.
+DEFERRED_IMPORTS: Dict[str, List[str]] = {
+    "sec_ingest": ["pandas", "requests", "tenacity"],
+    "ai_advisor": ["numpy"],
+    "app": ["pandas", "forecast", "normalize", "metrics", "sensitivity", "valuation_comps", "valuation_dcf"],
+}
+
+HEAVY_PACKAGES = {"numpy", "pandas", "requests", "tenacity", "xlsxwriter", "openpyxl", "openai", "pyarrow"}
+
+APP_SCRIPT = Path(__file__).resolve().parent / "app.py"
+
+DEFAULT_MODULES = ["app", "sec_ingest", "ai_advisor", "report", "normalize", "forecast", "sensitivity"]
+
+
+def measure_import(statement: str, repeats: int = 3) -> Tuple[float, List[str]]:
+    """Best-of-``repeats`` import time in ms of ``statement`` and the heavy packages it loaded.
+
+    Interpreter startup imports (``site``, ``encodings``...) are excluded.
+    """
+    best = float("inf")
+    loaded: List[str] = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        total_us = 0
+        packages = set()
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, raw_name = line[len("import time:"):].split("|")
+            name = raw_name.strip()
+            packages.add(name.split(".")[0])
+            # Nested imports are indented; only top-level entries count towards the total.
+            if not raw_name.startswith("  ") and name not in _startup_modules():
+                total_us += int(cumulative)
+        best = min(best, total_us / 1000.0)
+        loaded = sorted(packages & HEAVY_PACKAGES)
+    return best, loaded
+
+
+_STARTUP: List[str] = []
+
+
+def _startup_modules() -> List[str]:
+    if not _STARTUP:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True, check=True
+        )
+        _STARTUP.extend(
+            line.split("|")[-1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")
+        )
+    return _STARTUP
+
+
+def app_import_statements(script: Path = APP_SCRIPT) -> List[str]:
+    """Module-level import statements of the Streamlit script, without running it."""
+    tree = ast.parse(script.read_text())
+    statements = []
+    for node in tree.body:
+        if isinstance(node, ast.Import) or (isinstance(node, ast.ImportFrom) and node.module != "__future__"):
+            statements.append(ast.unparse(node))
+    return statements
+
+
+def _import_statements(module: str) -> List[str]:
+    return app_import_statements() if module == "app" else [f"import {module}"]
+
+
+def report(modules: List[str]) -> List[dict]:
+    rows = []
+    for module in modules:
+        statements = _import_statements(module)
+        lazy_ms, loaded = measure_import("; ".join(statements))
+        deferred = DEFERRED_IMPORTS.get(module, [])
+        eager_ms = lazy_ms
+        if deferred:
+            eager_ms, _ = measure_import("; ".join([*statements, *(f"import {name}" for name in deferred)]))
+        rows.append(
+            {
+                "module": module,
+                "import_ms": lazy_ms,
+                "eager_ms": eager_ms,
+                "saved_ms": eager_ms - lazy_ms,
+                "loaded": loaded,
+            }
+        )
+    return rows
+
+
+def main(argv: List[str]) -> None:
+    rows = report(argv or DEFAULT_MODULES)
+    print(f"{'module':<14}{'import ms':>11}{'eager ms':>11}{'saved ms':>11}  heavy packages loaded")
+    for row in rows:
+        print(
+            f"{row['module']:<14}{row['import_ms']:>11.1f}{row['eager_ms']:>11.1f}{row['saved_ms']:>11.1f}"
+            f"  {', '.join(row['loaded'])}"
+        )
+    print(f"{'total':<14}{sum(r['import_ms'] for r in rows):>11.1f}{sum(r['eager_ms'] for r in rows):>11.1f}"
+          f"{sum(r['saved_ms'] for r in rows):>11.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
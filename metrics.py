@@ -0,0 +1,174 @@
+"""Historical metrics (margins, growth, reinvestment, volatility) per company."""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from facts_store import default_store_path
+
+DEFAULT_TAX_RATE = 0.21
+
+METRIC_COLUMNS = [
+    "gross_margin",
+    "operating_margin",
+    "net_margin",
+    "revenue_cagr",
+    "revenue_growth_volatility",
+    "capex_to_revenue",
+    "reinvestment_rate",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history_metrics (
+    cik TEXT PRIMARY KEY,
+    as_of_year INTEGER NOT NULL,
+    years INTEGER NOT NULL,
+    input_digest TEXT,
+    {}
+);
+""".format(",\n    ".join(f"{col} REAL" for col in METRIC_COLUMNS))
+
+
+def input_digests(df: pd.DataFrame, tax_rate: float = DEFAULT_TAX_RATE) -> pd.Series:
+    """Order-independent digest of each company's ``line_item``/``year``/``value`` rows, by ``cik``.
+
+    Any amended value, added or removed row, or a different ``tax_rate``
+    changes the digest, so stored metrics are recomputed exactly when their
+    inputs change.
+    """
+    rows = pd.util.hash_pandas_object(df[["line_item", "year", "value"]], index=False)
+    digests = {}
+    for cik, hashes in rows.groupby(df["cik"].to_numpy()):
+        digest = hashlib.sha256(repr(float(tax_rate)).encode())
+        digest.update(np.sort(hashes.to_numpy()).tobytes())
+        digests[cik] = digest.hexdigest()
+    return pd.Series(digests, dtype=object)
+
+
+def _column(wide: pd.DataFrame, line_item: str) -> pd.Series:
+    if line_item in wide.columns:
+        return wide[line_item]
+    return pd.Series(np.nan, index=wide.index)
+
+
+def compute_history_metrics(df: pd.DataFrame, tax_rate: float = DEFAULT_TAX_RATE) -> pd.DataFrame:
+    """Metrics for every company in a canonical long frame, indexed by ``cik``.
+
+    ``df`` has ``line_item``, ``year`` and ``value`` columns plus an optional
+    ``cik`` column; a frame without one is treated as a single company ``""``.
+    Margins and ratios are medians of the yearly values.
+    """
+    if "cik" not in df.columns:
+        df = df.assign(cik="")
+    wide = df.pivot_table(index=["cik", "year"], columns="line_item", values="value", aggfunc="mean").sort_index()
+    revenue = _column(wide, "Revenue").replace(0, np.nan)
+    gross_profit = _column(wide, "Gross profit").fillna(revenue - _column(wide, "Cost of revenue"))
+    operating_income = _column(wide, "Operating income")
+    nopat = (operating_income * (1 - tax_rate)).replace(0, np.nan)
+    net_investment = _column(wide, "Capex").abs() - _column(wide, "D&A").fillna(0.0)
+
+    yearly = pd.DataFrame(
+        {
+            "gross_margin": gross_profit / revenue,
+            "operating_margin": operating_income / revenue,
+            "net_margin": _column(wide, "Net income") / revenue,
+            "capex_to_revenue": _column(wide, "Capex").abs() / revenue,
+            "reinvestment_rate": net_investment / nopat,
+            "revenue_growth": revenue.groupby(level="cik").pct_change(),
+            "revenue": revenue,
+        }
+    )
+    by_company = yearly.groupby(level="cik")
+    metrics = by_company[["gross_margin", "operating_margin", "net_margin", "capex_to_revenue", "reinvestment_rate"]].median()
+    metrics["revenue_growth_volatility"] = by_company["revenue_growth"].std()
+
+    revenue_points = yearly["revenue"].dropna().reset_index()
+    first = revenue_points.groupby("cik").first()
+    last = revenue_points.groupby("cik").last()
+    periods = (last["year"] - first["year"]).replace(0, np.nan)
+    metrics["revenue_cagr"] = (last["revenue"] / first["revenue"]) ** (1 / periods) - 1
+
+    years = wide.reset_index().groupby("cik")["year"]
+    metrics["as_of_year"] = years.max().astype(int)
+    metrics["years"] = years.nunique().astype(int)
+    return metrics[["as_of_year", "years", *METRIC_COLUMNS]]
+
+
+class MetricsStore:
+    """Persisted history metrics, read per company and keyed on a digest of their inputs.
+
+    Every lookup reads the company's row, so an ``invalidate`` or ``update``
+    from another store instance or process is seen on the next call.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path is not None else default_store_path()
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(history_metrics)")}
+        if "input_digest" not in columns:
+            # Tables created before digests existed: NULL digests recompute on next use.
+            with self._conn:
+                self._conn.execute("ALTER TABLE history_metrics ADD COLUMN input_digest TEXT")
+        self._lock = threading.RLock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, cik: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM history_metrics WHERE cik = ?", (cik,))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        record = dict(zip((desc[0] for desc in cur.description), row))
+        record.pop("cik")
+        return record
+
+    def update(self, df: pd.DataFrame, tax_rate: float = DEFAULT_TAX_RATE) -> List[str]:
+        """Recompute metrics for companies whose input rows changed since they were stored.
+
+        Returns the ciks that were (re)computed.
+        """
+        if df.empty:
+            return []
+        if "cik" not in df.columns:
+            df = df.assign(cik="")
+        digests = input_digests(df, tax_rate=tax_rate)
+        with self._lock:
+            stale = []
+            for cik, digest in digests.items():
+                stored = self.get(cik)
+                if stored is None or stored["input_digest"] != digest:
+                    stale.append(cik)
+            if not stale:
+                return []
+            metrics = compute_history_metrics(df[df["cik"].isin(stale)], tax_rate=tax_rate)
+            metrics.insert(2, "input_digest", digests.reindex(metrics.index))
+            metrics = metrics.astype(object).where(metrics.notna(), None)
+            columns = ["cik", *metrics.columns]
+            sql = "INSERT OR REPLACE INTO history_metrics ({}) VALUES ({})".format(
+                ", ".join(columns), ", ".join("?" for _ in columns)
+            )
+            with self._conn:
+                self._conn.executemany(
+                    sql, [(cik, *row) for cik, row in zip(metrics.index, metrics.itertuples(index=False))]
+                )
+            return list(metrics.index)
+
+    def invalidate(self, ciks: List[str]) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.executemany("DELETE FROM history_metrics WHERE cik = ?", [(cik,) for cik in ciks])
+
+    def get_or_compute(self, cik: str, df: pd.DataFrame) -> Dict[str, object]:
+        self.update(df.assign(cik=cik))
+        return self.get(cik) or {}
@@ -1,10 +1,14 @@
 """Normalize SEC facts into canonical statement long format."""
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+if TYPE_CHECKING:
+    from facts_store import FactsStore
+
 STATEMENT_TAGS = {
     "IS": {
         "Revenues": "Revenue",
@@ -33,25 +37,55 @@ STATEMENT_TAGS = {
 }
 
 
+# Columns that identify one reported fact: the same filing repeats prior-year
+# comparatives under the same accession and tag, so the period is part of the key.
+FACT_KEY_COLUMNS = ["taxonomy", "tag", "unit", "accn", "start", "end", "fy", "fp", "frame"]
+
+# Period columns carried from each fact into the mapped rows.
+FACT_PERIOD_COLUMNS = ["unit", "start", "end", "fp", "frame"]
+
+
+def fact_ids(df: pd.DataFrame) -> pd.Series:
+    """Stable int64 id per fact, hashed from ``FACT_KEY_COLUMNS``.
+
+    The id depends only on the fact itself, so companyfacts JSON and the facts
+    store give the same ids regardless of row order or missing-value types.
+    """
+    keys = pd.DataFrame(index=df.index)
+    for column in FACT_KEY_COLUMNS:
+        values = df[column] if column in df.columns else pd.Series(pd.NA, index=df.index)
+        if column == "fy":
+            values = pd.to_numeric(values, errors="coerce").astype("Int64")
+        keys[column] = values.astype("string").fillna("")
+    hashed = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return pd.Series(hashed.view(np.int64), index=df.index, name="fact_id")
+
+
 def map_facts_to_statements(df: pd.DataFrame) -> pd.DataFrame:
-    rows: List[dict] = []
+    frames: List[pd.DataFrame] = []
     for statement, tag_map in STATEMENT_TAGS.items():
         for tag, label in tag_map.items():
             subset = df[df["tag"] == tag]
             if subset.empty:
                 continue
-            for _, row in subset.iterrows():
-                rows.append(
-                    {
-                        "statement": statement,
-                        "line_item": label,
-                        "year": int(row["fy"]) if pd.notna(row["fy"]) else None,
-                        "value": row["value"],
-                        "source_tag": tag,
-                        "source_taxonomy": row["taxonomy"],
-                    }
-                )
-    return pd.DataFrame(rows)
+            mapped = pd.DataFrame(
+                {
+                    "statement": statement,
+                    "line_item": label,
+                    "year": pd.to_numeric(subset["fy"], errors="coerce").astype("Int64"),
+                    "value": subset["value"],
+                    "source_tag": tag,
+                    "source_taxonomy": subset["taxonomy"],
+                    "accn": subset["accn"] if "accn" in subset.columns else None,
+                    "fact_id": fact_ids(subset),
+                }
+            )
+            for column in FACT_PERIOD_COLUMNS:
+                mapped[column] = subset[column] if column in subset.columns else None
+            frames.append(mapped)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
 
 
 def canonicalize_long_format(df: pd.DataFrame) -> pd.DataFrame:
@@ -66,3 +100,33 @@ def ensure_statement_coverage(df: pd.DataFrame) -> Dict[str, List[str]]:
         if df[df["statement"] == statement].empty:
             missing[statement] = ["No mapped tags"]
     return missing
+
+
+def tags_for_line_item(line_item: str) -> List[str]:
+    return [tag for tag_map in STATEMENT_TAGS.values() for tag, label in tag_map.items() if label == line_item]
+
+
+def cross_sectional_frame(store: "FactsStore", line_item: str, frame: str, unit: Optional[str] = "USD") -> pd.DataFrame:
+    """One value per filer for ``line_item`` in a calendar ``frame`` such as ``CY2023``."""
+    tags = tags_for_line_item(line_item)
+    df = store.load_frame(frame, tags=tags)
+    if unit is not None:
+        df = df[df["unit"] == unit]
+    if df.empty:
+        return pd.DataFrame(columns=["cik", "line_item", "frame", "value", "source_tag", "accn"])
+    # Prefer tags in STATEMENT_TAGS order, then the latest filing, when a filer reports several.
+    priority = {tag: idx for idx, tag in enumerate(tags)}
+    df = df.assign(_priority=df["tag"].map(priority)).sort_values(
+        ["cik", "_priority", "filed"], ascending=[True, True, False]
+    )
+    df = df.drop_duplicates("cik", keep="first")
+    return pd.DataFrame(
+        {
+            "cik": df["cik"].to_numpy(),
+            "line_item": line_item,
+            "frame": frame,
+            "value": df["value"].to_numpy(),
+            "source_tag": df["tag"].to_numpy(),
+            "accn": df["accn"].to_numpy(),
+        }
+    )
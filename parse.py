@@ -5,9 +5,17 @@ import re
 from typing import Optional, Tuple
 
 import numpy as np
+import pandas as pd
 
 YEAR_RE = re.compile(r"(20\d{2})")
 
+# Header tokens of sub-annual or derived columns ("Q1 2023", "1H23", "9M 2023",
+# "LTM", "CAGR 2019-2023") that carry a year but are not that fiscal year.
+INTERIM_PERIOD_RE = (
+    r"(?i)(?<![a-z])(?:q\s*[1-4]|[1-4]\s*q|h\s*[12]|[12]\s*h|hy|[369]\s*m(?:e|os?|onths?)?"
+    r"|(?:three|six|nine)\s+months|quarter(?:ly|s)?|half|ytd|ltm|ttm|ntm|cagr)(?![a-z])"
+)
+
 
 def parse_numeric(value: object) -> Optional[float]:
     if value is None:
@@ -54,3 +62,51 @@ def safe_divide(numerator: float, denominator: float) -> float:
 
 def clean_label(label: str) -> str:
     return re.sub(r"\s+", " ", label.strip())
+
+
+# Vectorized counterparts used when ingesting whole workbook columns at once.
+
+_SCALE_WORDS = (("billion", 1_000_000_000.0), ("million", 1_000_000.0), ("thousand", 1_000.0))
+_SCALE_RE = re.compile(r"\b(?:in\s+)?(thousand|million|billion)s?\b", re.IGNORECASE)
+
+
+def unit_scale(text: str) -> float:
+    """Multiplier implied by a unit caption such as ``"USD in millions"``."""
+    text = text.lower()
+    for word, scale in _SCALE_WORDS:
+        if word in text:
+            return scale
+    return 1.0
+
+
+def find_unit_scale(texts) -> float:
+    """First explicit scale caption found in ``texts``, else 1."""
+    for text in texts:
+        if isinstance(text, str) and _SCALE_RE.search(text):
+            return unit_scale(text)
+    return 1.0
+
+
+def parse_numeric_series(values: pd.Series) -> pd.Series:
+    """Vectorized ``parse_numeric`` that also reads ``(1,234)`` as a negative number."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    # Currency symbols come off first so "$(50)" is read like "(50)".
+    text = values.astype("string").str.replace(r"[$€£¥\s]", "", regex=True)
+    negative = text.str.startswith("(") & text.str.endswith(")")
+    cleaned = text.str.replace(r"[,()]", "", regex=True).replace({"": pd.NA, "-": pd.NA, "—": pd.NA})
+    numbers = pd.to_numeric(cleaned, errors="coerce").astype(float)
+    return numbers.where(~negative.fillna(False), -numbers)
+
+
+def detect_year_series(labels: pd.Series) -> pd.Series:
+    return pd.to_numeric(labels.astype("string").str.extract(YEAR_RE, expand=False), errors="coerce").astype("Int64")
+
+
+def interim_period_mask(labels: pd.Series) -> pd.Series:
+    """True for labels naming a quarter, half, year-to-date, LTM or CAGR period rather than a full year."""
+    return labels.astype("string").str.contains(INTERIM_PERIOD_RE, regex=True).fillna(False).astype(bool)
+
+
+def clean_label_series(labels: pd.Series) -> pd.Series:
+    return labels.astype("string").str.strip().str.replace(r"\s+", " ", regex=True)
@@ -0,0 +1,111 @@
+"""Quarterly and trailing-twelve-month series from flattened SEC facts."""
+from __future__ import annotations
+
+from typing import List, Optional
+
+import pandas as pd
+
+from normalize import STATEMENT_TAGS
+
+QUARTER_DAYS = (80, 100)
+ANNUAL_DAYS = (350, 380)
+
+QUARTERLY_COLUMNS = ["cik", "tag", "unit", "start", "end", "fp", "value", "ttm", "kind", "derived"]
+
+
+def _prepare(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    if "cik" not in df.columns:
+        df["cik"] = ""
+    df["start"] = pd.to_datetime(df["start"], errors="coerce")
+    df["end"] = pd.to_datetime(df["end"], errors="coerce")
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    df = df.dropna(subset=["end", "value"])
+    # A period can be reported in several filings; the latest filing wins.
+    return df.sort_values("filed").drop_duplicates(["cik", "tag", "unit", "start", "end"], keep="last")
+
+
+def _derive_q4(quarters: pd.DataFrame, annual: pd.DataFrame) -> pd.DataFrame:
+    """Q4 = fiscal year minus the three reported quarters inside it."""
+    keys = ["cik", "tag", "unit"]
+    annual = annual[[*keys, "start", "end", "value"]].reset_index(drop=True)
+    annual["annual_id"] = annual.index
+    pairs = annual.merge(quarters[[*keys, "start", "end", "value"]], on=keys, suffixes=("", "_q"))
+    pairs = pairs[(pairs["start_q"] >= pairs["start"]) & (pairs["end_q"] <= pairs["end"])]
+    inside = pairs.groupby("annual_id").agg(count=("value_q", "size"), total=("value_q", "sum"), last_end=("end_q", "max"))
+    inside = inside[(inside["count"] == 3) & (inside["last_end"] < annual.loc[inside.index, "end"])]
+    q4 = annual.loc[inside.index, [*keys, "end"]].copy()
+    q4["start"] = inside["last_end"] + pd.Timedelta(days=1)
+    q4["value"] = annual.loc[inside.index, "value"] - inside["total"]
+    q4["fp"] = "Q4"
+    q4["derived"] = True
+    return q4
+
+
+def build_quarterly_series(df: pd.DataFrame) -> pd.DataFrame:
+    """Quarterly values plus a ``ttm`` column for every tag and company in ``df``.
+
+    Flow items (facts with a ``start``) keep discrete quarters, with Q4 derived
+    where only the annual figure was filed, and ``ttm`` is the rolling sum of
+    four consecutive quarters. Balance-sheet items (instant facts) keep one
+    value per period end and ``ttm`` is that point-in-time value.
+    """
+    df = _prepare(df)
+    keys = ["cik", "tag", "unit"]
+    if "fp" not in df.columns:
+        df["fp"] = None
+
+    durations = df[df["start"].notna()].copy()
+    days = (durations["end"] - durations["start"]).dt.days
+    quarters = durations[days.between(*QUARTER_DAYS)].assign(derived=False)
+    annual = durations[days.between(*ANNUAL_DAYS)]
+    q4 = _derive_q4(quarters, annual)
+    # Keep derived Q4s only where no quarter ending on the same date was filed.
+    q4 = q4.merge(quarters[[*keys, "end"]], on=[*keys, "end"], how="left", indicator=True)
+    q4 = q4[q4["_merge"] == "left_only"].drop(columns="_merge")
+
+    flows = pd.concat([quarters, q4], ignore_index=True).sort_values([*keys, "end"]).reset_index(drop=True)
+    grouped = flows.groupby(keys, sort=False)
+    rolling = grouped["value"].rolling(4, min_periods=4).sum().reset_index(level=list(range(len(keys))), drop=True)
+    window_start = grouped["start"].shift(3)
+    contiguous = (flows["end"] - window_start).dt.days.between(*ANNUAL_DAYS)
+    flows["ttm"] = rolling.where(contiguous)
+    flows["kind"] = "flow"
+
+    instants = df[df["start"].isna()].copy()
+    instants = instants.sort_values("filed").drop_duplicates([*keys, "end"], keep="last")
+    instants["ttm"] = instants["value"]
+    instants["kind"] = "instant"
+    instants["derived"] = False
+
+    result = pd.concat([flows, instants], ignore_index=True)
+    return result[QUARTERLY_COLUMNS].sort_values([*keys, "end"]).reset_index(drop=True)
+
+
+def _tag_table() -> pd.DataFrame:
+    rows: List[dict] = []
+    for statement, tag_map in STATEMENT_TAGS.items():
+        for priority, (tag, label) in enumerate(tag_map.items()):
+            rows.append({"tag": tag, "statement": statement, "line_item": label, "priority": priority})
+    return pd.DataFrame(rows)
+
+
+def ttm_statements(quarterly: pd.DataFrame, as_of: Optional[str] = None, unit: str = "USD") -> pd.DataFrame:
+    """Latest TTM (flows) or point-in-time (balance sheet) value per company and line item."""
+    df = quarterly[(quarterly["unit"] == unit) & quarterly["ttm"].notna()]
+    if as_of is not None:
+        df = df[df["end"] <= pd.Timestamp(as_of)]
+    df = df.merge(_tag_table(), on="tag")
+    df = df.sort_values(["cik", "line_item", "end", "priority"], ascending=[True, True, False, True])
+    latest = df.drop_duplicates(["cik", "line_item"], keep="first")
+    return latest.drop(columns="value").rename(columns={"ttm": "value", "end": "period_end", "tag": "source_tag"})[
+        ["cik", "statement", "line_item", "period_end", "value", "source_tag"]
+    ].reset_index(drop=True)
+
+
+def quarterly_statements(quarterly: pd.DataFrame, unit: str = "USD") -> pd.DataFrame:
+    """Canonical long frame of discrete quarterly values keyed by period end."""
+    df = quarterly[quarterly["unit"] == unit].merge(_tag_table(), on="tag")
+    df = df.sort_values(["cik", "line_item", "end", "priority"]).drop_duplicates(["cik", "line_item", "end"])
+    df = df.assign(quarter=df["end"].dt.to_period("Q").astype(str))
+    return df[["cik", "statement", "line_item", "quarter", "end", "value", "ttm", "derived"]].reset_index(drop=True)
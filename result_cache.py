@@ -0,0 +1,263 @@
+"""Persistent, content-addressed cache for forecast, DCF and sensitivity results.
+
+Keys are hashes of the normalized inputs, the assumptions and the source of
+the modules that produce the result, so a change to facts, assumptions or
+model code misses the cache instead of returning stale numbers. Results are
+pickled under ``.cache/results`` with an SQLite index that records size and
+last access for LRU eviction.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, TypeVar
+
+import numpy as np
+import pandas as pd
+
+from forecast import ForecastResult
+from sensitivity import AdaptiveSensitivity, SensitivityGrid
+from valuation_dcf import DCFResult
+
+T = TypeVar("T")
+
+RESULTS_DIR = Path(".cache") / "results"
+INDEX_NAME = "index.sqlite"
+
+# Modules whose source is hashed into every key; editing any of them invalidates the cache.
+CODE_MODULES = (
+    "forecast.py",
+    "stat_forecast.py",
+    "classify.py",
+    "parse.py",
+    "valuation_dcf.py",
+    "sensitivity.py",
+)
+
+FORECAST = "forecast"
+DCF = "dcf"
+SENSITIVITY = "sensitivity"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    cik TEXT,
+    label TEXT,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access);
+CREATE INDEX IF NOT EXISTS idx_results_cik_kind ON results (cik, kind, created);
+"""
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Digest of the modelling modules' source."""
+    digest = hashlib.sha256()
+    root = Path(__file__).resolve().parent
+    for name in CODE_MODULES:
+        digest.update(name.encode())
+        digest.update((root / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Order-independent digest of a long frame's columns and rows."""
+    df = df.set_axis([str(col) for col in df.columns], axis=1)
+    columns = sorted(df.columns)
+    # Sorting row hashes rather than rows avoids comparing mixed-type columns.
+    rows = np.sort(pd.util.hash_pandas_object(df[columns], index=False).to_numpy())
+    digest = hashlib.sha256(json.dumps(columns).encode())
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+def _canonical(value: object) -> object:
+    if isinstance(value, pd.DataFrame):
+        return {"frame": frame_digest(value)}
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return _canonical(dataclasses.asdict(value))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _canonical(value.tolist())
+    if isinstance(value, (np.floating, float)):
+        # repr round-trips, so equal floats hash equally and near-equal ones do not.
+        return repr(float(value))
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def result_key(kind: str, **inputs: object) -> str:
+    """Content hash of ``kind``, its inputs and the current code version."""
+    payload = {"kind": kind, "code": code_version(), "inputs": _canonical(inputs)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """Pickled results on disk with an LRU index bounded by entries and bytes."""
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_entries: int = 2000,
+        max_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else RESULTS_DIR
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.directory / INDEX_NAME), check_same_thread=False, timeout=30)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[object]:
+        with self._lock:
+            row = self._conn.execute("SELECT file FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = self.directory / row[0]
+            try:
+                value = pickle.loads(path.read_bytes())
+            except (OSError, pickle.UnpicklingError, EOFError):
+                # Another process evicted the file, or it is truncated: treat as a miss.
+                with self._conn:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            return value
+
+    def put(self, key: str, value: object, kind: str, cik: Optional[str] = None, label: Optional[str] = None) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        file = f"{key}.pkl"
+        tmp = self.directory / f"{file}.{os.getpid()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.directory / file)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, kind, cik, label, file, size, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, cik, label, file, len(data), now, now),
+                )
+            self._evict()
+
+    def get_or_compute(
+        self,
+        kind: str,
+        compute: Callable[[], T],
+        cik: Optional[str] = None,
+        label: Optional[str] = None,
+        **inputs: object,
+    ) -> T:
+        """Cached result for ``kind`` and ``inputs``, computing and storing it on a miss."""
+        key = result_key(kind, **inputs)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        value = compute()
+        self.put(key, value, kind, cik=cik, label=label)
+        return value
+
+    def _evict(self) -> None:
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        doomed: List[tuple] = []
+        for key, file, size in self._conn.execute("SELECT key, file, size FROM results ORDER BY last_access"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key, file))
+            count -= 1
+            total -= size
+        with self._conn:
+            self._conn.executemany("DELETE FROM results WHERE key = ?", [(key,) for key, _ in doomed])
+        for _, file in doomed:
+            (self.directory / file).unlink(missing_ok=True)
+
+    def entries(self, cik: Optional[str] = None, kind: Optional[str] = None) -> pd.DataFrame:
+        """Index rows, newest first, optionally filtered by company and kind."""
+        clauses, params = [], []
+        for column, value in (("cik", cik), ("kind", kind)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        columns = ["key", "kind", "cik", "label", "size", "created", "last_access"]
+        with self._lock:
+            cur = self._conn.execute(f"SELECT {', '.join(columns)} FROM results {where} ORDER BY created DESC, rowid DESC", params)
+            return pd.DataFrame(cur.fetchall(), columns=columns)
+
+    def diff(self, key_a: str, key_b: str) -> object:
+        """Difference between two cached results of the same kind (see ``diff_results``)."""
+        a, b = self.get(key_a), self.get(key_b)
+        if a is None or b is None:
+            missing = key_a if a is None else key_b
+            raise KeyError(f"No cached result for key {missing}.")
+        return diff_results(a, b)
+
+
+def diff_forecasts(a: ForecastResult, b: ForecastResult) -> pd.DataFrame:
+    """Per line item and year: both values, the change and the relative change."""
+    keys = ["statement", "line_item", "year"]
+    merged = a.forecast[keys + ["value"]].merge(
+        b.forecast[keys + ["value"]], on=keys, how="outer", suffixes=("_a", "_b")
+    )
+    merged["delta"] = merged["value_b"] - merged["value_a"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        merged["pct_change"] = merged["delta"] / merged["value_a"].abs()
+    return merged.sort_values(keys).reset_index(drop=True)
+
+
+def diff_dcf(a: DCFResult, b: DCFResult) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {"a": getattr(a, name), "b": getattr(b, name), "delta": getattr(b, name) - getattr(a, name)}
+        for name in (field.name for field in dataclasses.fields(DCFResult))
+    }
+
+
+def diff_grids(a: SensitivityGrid, b: SensitivityGrid) -> SensitivityGrid:
+    """Cell-wise ``b - a``; both grids must share their axes."""
+    if not (np.allclose(a.x_values, b.x_values) and np.allclose(a.y_values, b.y_values)):
+        raise ValueError("Sensitivity grids have different axes.")
+    return SensitivityGrid(x_values=list(a.x_values), y_values=list(a.y_values), grid=np.asarray(b.grid) - np.asarray(a.grid))
+
+
+def diff_results(a: object, b: object) -> object:
+    if type(a) is not type(b):
+        raise TypeError(f"Cannot diff {type(a).__name__} against {type(b).__name__}.")
+    if isinstance(a, ForecastResult):
+        return diff_forecasts(a, b)
+    if isinstance(a, DCFResult):
+        return diff_dcf(a, b)
+    if isinstance(a, SensitivityGrid):
+        return diff_grids(a, b)
+    if isinstance(a, AdaptiveSensitivity):
+        return diff_grids(a.dense, b.dense)
+    raise TypeError(f"No diff for {type(a).__name__}.")
@@ -5,11 +5,16 @@ import json
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
-import pandas as pd
-import requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from facts_store import FactsStore
+    from metrics import MetricsStore
+
+# pandas, requests and tenacity are imported on first use so that importing this
+# module stays cheap and has no side effects (the cache directory is created lazily).
 
 SEC_HEADERS = {
     "User-Agent": "AI-Assisted Valuation (educational; contact: support@example.com)",
@@ -18,7 +23,6 @@ SEC_HEADERS = {
 }
 
 CACHE_DIR = Path(".cache")
-CACHE_DIR.mkdir(exist_ok=True)
 
 TICKER_CIK_URL = "https://www.sec.gov/files/company_tickers.json"
 COMPANY_FACTS_URL = "https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
@@ -31,6 +35,19 @@ class CompanyProfile:
     title: str
 
 
+@dataclass
+class FactsDelta:
+    cik: str
+    new_accessions: List[str]
+    new_facts: int
+    amended_facts: int
+    fetched: bool
+
+    @property
+    def changed(self) -> bool:
+        return self.new_facts > 0
+
+
 class SecRateLimiter:
     def __init__(self, min_interval: float = 0.2) -> None:
         self.min_interval = min_interval
@@ -46,19 +63,37 @@ class SecRateLimiter:
 rate_limiter = SecRateLimiter()
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
-def _get_json(url: str) -> dict:
+def _fetch_json(url: str) -> dict:
+    import requests
+
     rate_limiter.wait()
     response = requests.get(url, headers=SEC_HEADERS, timeout=30)
     response.raise_for_status()
     return response.json()
 
 
+_retrying_fetch = None
+
+
+def _get_json(url: str) -> dict:
+    global _retrying_fetch
+    if _retrying_fetch is None:
+        from tenacity import retry, stop_after_attempt, wait_exponential
+
+        _retrying_fetch = retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))(
+            _fetch_json
+        )
+    return _retrying_fetch(url)
+
+
 def _cache_path(name: str) -> Path:
+    CACHE_DIR.mkdir(exist_ok=True)
     return CACHE_DIR / name
 
 
 def load_ticker_cik_mapping(force_refresh: bool = False) -> pd.DataFrame:
+    import pandas as pd
+
     cache_path = _cache_path("ticker_cik.json")
     if cache_path.exists() and not force_refresh:
         data = json.loads(cache_path.read_text())
@@ -93,9 +128,9 @@ def search_tickers(index: Dict[str, CompanyProfile], query: str, limit: int = 20
     return matches[:limit]
 
 
-def fetch_company_facts(cik: str) -> dict:
+def fetch_company_facts(cik: str, refresh: bool = False) -> dict:
     cache_path = _cache_path(f"companyfacts_{cik}.json")
-    if cache_path.exists():
+    if cache_path.exists() and not refresh:
         return json.loads(cache_path.read_text())
     data = _get_json(COMPANY_FACTS_URL.format(cik=cik))
     cache_path.write_text(json.dumps(data))
@@ -114,6 +149,8 @@ def get_company_facts_by_ticker(ticker: str) -> Tuple[CompanyProfile, dict]:
 
 
 def flatten_company_facts(facts: dict) -> pd.DataFrame:
+    import pandas as pd
+
     records: List[dict] = []
     facts_data = facts.get("facts", {})
     for taxonomy, tags in facts_data.items():
@@ -141,6 +178,129 @@ def flatten_company_facts(facts: dict) -> pd.DataFrame:
     return df
 
 
+def load_company_facts_frame(cik: str, store: Optional["FactsStore"] = None) -> pd.DataFrame:
+    """Flattened facts for ``cik``, served from the indexed store when one is given."""
+    if store is not None and store.has_company(cik):
+        return store.load_company(cik)
+    flat = flatten_company_facts(fetch_company_facts(cik))
+    if store is not None:
+        store.replace_company(cik, flat)
+    return flat
+
+
+# Columns that identify a fact reported without an accession number.
+FACT_IDENTITY = ["tag", "unit", "start", "end", "value"]
+
+
+def _fact_identity(df: pd.DataFrame) -> pd.MultiIndex:
+    import pandas as pd
+
+    keys = df[FACT_IDENTITY].assign(value=pd.to_numeric(df["value"], errors="coerce").astype(float))
+    return pd.MultiIndex.from_frame(keys.astype("string").fillna(""))
+
+
+def new_accessions_from_index(store: "FactsStore", cik: str, filings_index: pd.DataFrame) -> List[str]:
+    """Accessions listed for ``cik`` in a local filings index (``cik``, ``accn`` columns) but not yet stored."""
+    known = store.accessions(cik)
+    listed = filings_index.loc[filings_index["cik"] == cik, "accn"].dropna().unique()
+    return sorted(accn for accn in listed if accn not in known)
+
+
+def refresh_company_facts(
+    cik: str,
+    store: "FactsStore",
+    filings_index: Optional[pd.DataFrame] = None,
+    payload: Optional[dict] = None,
+    metrics_store: Optional["MetricsStore"] = None,
+) -> FactsDelta:
+    """Apply only facts from accessions not yet stored for ``cik``.
+
+    When ``filings_index`` shows no unseen accessions the SEC is not contacted.
+    Otherwise ``payload`` (or a fresh companyfacts download) is diffed against the
+    stored accession numbers; facts from new filings are appended, including
+    amendments that restate a period already held. Facts without an accession
+    number are appended only when no identical fact is stored. ``amended_facts``
+    counts new facts whose value differs from a stored fact for the same period
+    filed earlier. Only when something changed is the JSON cache rewritten and
+    the company's derived metrics invalidated.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if filings_index is not None and store.has_company(cik):
+        if not new_accessions_from_index(store, cik, filings_index):
+            return FactsDelta(cik=cik, new_accessions=[], new_facts=0, amended_facts=0, fetched=False)
+
+    if payload is None:
+        payload = _get_json(COMPANY_FACTS_URL.format(cik=cik))
+    flat = flatten_company_facts(payload)
+    if flat.empty:
+        return FactsDelta(cik=cik, new_accessions=[], new_facts=0, amended_facts=0, fetched=True)
+
+    known = store.accessions(cik)
+    numbered = flat["accn"].notna()
+    fresh = flat[numbered & ~flat["accn"].isin(list(known))]
+    # A fact without an accession number has no filing to diff by: it is new
+    # only when no stored fact has the same tag, unit, period and value.
+    unnumbered = flat[~numbered].drop_duplicates(FACT_IDENTITY)
+    if not unnumbered.empty:
+        stored = store.load_company(cik, tags=unnumbered["tag"].unique())
+        seen = _fact_identity(stored[stored["accn"].isna()])
+        fresh = pd.concat([fresh, unnumbered[~_fact_identity(unnumbered).isin(seen)]])
+    if fresh.empty:
+        return FactsDelta(cik=cik, new_accessions=[], new_facts=0, amended_facts=0, fetched=True)
+
+    # Restatements: a later filing reporting a different value for a stored period.
+    # Comparatives repeated unchanged in the next year's filing are not amendments.
+    period_key = ["tag", "unit", "start", "end"]
+    stored = store.load_company(cik, tags=fresh["tag"].unique())[[*period_key, "value", "filed"]]
+    restated = (
+        fresh[[*period_key, "value", "filed"]]
+        .reset_index(names="fact")
+        .merge(stored, on=period_key, how="inner", suffixes=("", "_stored"))
+    )
+    later = pd.to_datetime(restated["filed"], errors="coerce") > pd.to_datetime(restated["filed_stored"], errors="coerce")
+    differs = ~np.isclose(
+        pd.to_numeric(restated["value"], errors="coerce"), pd.to_numeric(restated["value_stored"], errors="coerce")
+    )
+    amended = restated.loc[later & differs, "fact"].nunique()
+
+    store.insert_facts(cik, fresh)
+    _cache_path(f"companyfacts_{cik}.json").write_text(json.dumps(payload))
+    if metrics_store is not None:
+        metrics_store.invalidate([cik])
+    return FactsDelta(
+        cik=cik,
+        new_accessions=sorted(fresh["accn"].dropna().unique()),
+        new_facts=len(fresh),
+        amended_facts=int(amended),
+        fetched=True,
+    )
+
+
+def refresh_companies(
+    ciks: Iterable[str],
+    store: "FactsStore",
+    filings_index: Optional[pd.DataFrame] = None,
+    metrics_store: Optional["MetricsStore"] = None,
+    publish_shared: bool = True,
+) -> List[FactsDelta]:
+    """Incremental refresh for many companies; returns only the ones that changed.
+
+    With ``publish_shared`` the host-wide normalized facts are republished
+    for the changed companies once the batch is applied.
+    """
+    deltas = [
+        refresh_company_facts(cik, store, filings_index=filings_index, metrics_store=metrics_store) for cik in ciks
+    ]
+    changed = [delta for delta in deltas if delta.changed]
+    if changed and publish_shared:
+        from shared_data import refresh_normalized_facts
+
+        refresh_normalized_facts(store)
+    return changed
+
+
 def latest_fiscal_years(df: pd.DataFrame, years: int = 5) -> List[int]:
     years_available = sorted(df["fy"].dropna().unique())
     return years_available[-years:]
@@ -6,7 +6,12 @@ from typing import List
 
 import numpy as np
 
-from valuation_dcf import DCFInputs, dcf_valuation, terminal_value_exit_multiple, terminal_value_perpetuity
+from valuation_dcf import (
+    DCFInputs,
+    dcf_valuation_batch,
+    terminal_value_exit_multiple,
+    terminal_value_perpetuity_batch,
+)
 
 
 @dataclass
@@ -30,23 +35,205 @@ def dcf_sensitivity(
 ) -> SensitivityGrid:
     wacc_values = build_grid(wacc_range[0], wacc_range[1], size)
     terminal_values = build_grid(terminal_range[0], terminal_range[1], size)
-    grid = np.zeros((len(wacc_values), len(terminal_values)))
-
-    for i, wacc in enumerate(wacc_values):
-        for j, terminal in enumerate(terminal_values):
-            if terminal_method == "exit_multiple":
-                tv = terminal_value_exit_multiple(base_inputs.terminal_value, terminal)
-            else:
-                tv = terminal_value_perpetuity(base_inputs.terminal_value, wacc, terminal)
-            inputs = DCFInputs(
-                ufcf=base_inputs.ufcf,
-                wacc=wacc,
-                terminal_method=terminal_method,
-                terminal_value=tv,
-                debt=base_inputs.debt,
-                cash=base_inputs.cash,
-                shares=base_inputs.shares,
-            )
-            result = dcf_valuation(inputs)
-            grid[i, j] = getattr(result, metric)
+    grid = evaluate_dcf_points(
+        base_inputs,
+        np.asarray(wacc_values)[:, None],
+        np.asarray(terminal_values)[None, :],
+        terminal_method,
+        metric,
+    )
     return SensitivityGrid(x_values=wacc_values, y_values=terminal_values, grid=grid)
+
+
+def evaluate_dcf_points(
+    base_inputs: DCFInputs,
+    wacc: np.ndarray,
+    terminal: np.ndarray,
+    terminal_method: str,
+    metric: str = "share_price",
+) -> np.ndarray:
+    """DCF ``metric`` for broadcastable arrays of WACC and terminal assumptions in one pass."""
+    wacc, terminal = np.broadcast_arrays(np.asarray(wacc, dtype=float), np.asarray(terminal, dtype=float))
+    if terminal_method == "exit_multiple":
+        tv = terminal_value_exit_multiple(base_inputs.terminal_value, terminal)
+    else:
+        tv = terminal_value_perpetuity_batch(base_inputs.terminal_value, wacc, terminal)
+    ufcf = np.broadcast_to(np.asarray(base_inputs.ufcf, dtype=float), (*wacc.shape, len(base_inputs.ufcf)))
+    results = dcf_valuation_batch(ufcf, wacc, tv, base_inputs.debt, base_inputs.cash, base_inputs.shares)
+    return results[metric]
+
+
+@dataclass
+class AdaptiveSensitivity:
+    """Irregular samples from adaptive refinement plus an interpolated dense view."""
+
+    x: np.ndarray
+    y: np.ndarray
+    values: np.ndarray
+    cells: np.ndarray
+    dense: SensitivityGrid
+    evaluations: int
+
+
+def dcf_sensitivity_adaptive(
+    base_inputs: DCFInputs,
+    wacc_range: tuple[float, float],
+    terminal_range: tuple[float, float],
+    terminal_method: str,
+    metric: str = "share_price",
+    initial_size: int = 5,
+    max_depth: int = 4,
+    tolerance: float = 0.01,
+    target: float | None = None,
+    dense_size: int = 41,
+    max_evaluations: int | None = None,
+) -> AdaptiveSensitivity:
+    """Sensitivity plane refined only where it matters.
+
+    Starts from an ``initial_size`` grid and repeatedly splits cells whose
+    centre value misses the bilinear estimate from the corners by more than
+    ``tolerance`` relative to the cell's own magnitude, that straddle
+    ``target`` (e.g. the market price, for break-even), or that are partly
+    undefined (WACC at or below terminal growth). Splits are prioritized by
+    relative error and stop once ``max_evaluations`` samples (default: half the
+    dense grid) have been used, so a pole cannot absorb the budget.
+
+    Leaf cells that still fail the accuracy test, such as cells next to the
+    WACC = growth pole, are never interpolated: their ``dense`` points are
+    evaluated exactly. ``cells`` holds the leaf cells as ``(x0, x1, y0, y1)``
+    rows and ``dense`` the result on a regular ``dense_size`` grid.
+    """
+    samples: dict[tuple[float, float], float] = {}
+    budget = max_evaluations if max_evaluations is not None else dense_size * dense_size // 2
+
+    def evaluate(points: list[tuple[float, float]]) -> None:
+        todo = [p for p in dict.fromkeys(points) if p not in samples]
+        if not todo:
+            return
+        xs, ys = np.array(todo).T
+        values = evaluate_dcf_points(base_inputs, xs, ys, terminal_method, metric)
+        samples.update(zip(todo, values.tolist()))
+
+    xs = [float(v) for v in build_grid(wacc_range[0], wacc_range[1], initial_size)]
+    ys = [float(v) for v in build_grid(terminal_range[0], terminal_range[1], initial_size)]
+    evaluate([(x, y) for x in xs for y in ys])
+    cells = [(xs[i], xs[i + 1], ys[j], ys[j + 1]) for i in range(len(xs) - 1) for j in range(len(ys) - 1)]
+
+    # Floor for the local scale, so cells whose values sit near zero are not split forever.
+    coarse = np.array(list(samples.values()))
+    coarse = coarse[np.isfinite(coarse)]
+    floor = 1e-3 * float(np.subtract(*np.percentile(np.abs(coarse), [75, 25]))) if coarse.size else 0.0
+
+    reciprocal_cells: set[tuple[float, float, float, float]] = set()
+
+    def relative_error(cell: tuple[float, float, float, float]) -> float:
+        """Centre miss relative to the cell's magnitude; ``inf`` for partly undefined cells, NaN if all undefined.
+
+        Near the WACC = growth pole values behave like ``1 / (wacc - g)``, so a
+        cell of one sign may interpolate ``1 / value`` instead when that
+        predicts its centre better.
+        """
+        x0, x1, y0, y1 = cell
+        corners = np.array([samples[(x0, y0)], samples[(x0, y1)], samples[(x1, y0)], samples[(x1, y1)]])
+        center = samples[((x0 + x1) / 2, (y0 + y1) / 2)]
+        values = np.append(corners, center)
+        finite = np.isfinite(values)
+        if not finite.any():
+            # The undefined region (WACC <= growth) is a half-plane, so it contains the whole cell.
+            return float("nan")
+        if not finite.all():
+            return float("inf")
+        scale = max(float(np.abs(values).max()), floor)
+        if scale == 0:
+            return 0.0
+        error = abs(center - corners.mean()) / scale
+        if error > tolerance and (np.all(values > 0) or np.all(values < 0)):
+            reciprocal_error = abs(center - 1 / np.mean(1 / corners)) / scale
+            if reciprocal_error < error:
+                reciprocal_cells.add(cell)
+                return reciprocal_error
+        return error
+
+    def straddles_target(cell: tuple[float, float, float, float]) -> bool:
+        x0, x1, y0, y1 = cell
+        values = [samples[(x, y)] for x in (x0, x1) for y in (y0, y1)] + [samples[((x0 + x1) / 2, (y0 + y1) / 2)]]
+        return target is not None and min(values) < target < max(values)
+
+    leaves: list[tuple[float, float, float, float]] = []
+    unresolved: list[tuple[float, float, float, float]] = []
+    for depth in range(max_depth + 1):
+        # Centres become child corners, so checking a cell costs at most one evaluation.
+        evaluate([((x0 + x1) / 2, (y0 + y1) / 2) for x0, x1, y0, y1 in cells])
+        errors = {cell: relative_error(cell) for cell in cells}
+        inaccurate = {cell for cell, error in errors.items() if error > tolerance}
+        wanted = [cell for cell in cells if cell in inaccurate or straddles_target(cell)]
+        # Worst cells first; each split costs at most five new corners plus four centres.
+        wanted.sort(key=lambda cell: -errors[cell] if cell in inaccurate else 0.0)
+        affordable = max(0, (budget - len(samples)) // 9) if depth < max_depth else 0
+        split = wanted[:affordable]
+        split_set = set(split)
+        for cell in cells:
+            if cell in split_set:
+                continue
+            leaves.append(cell)
+            if cell in inaccurate:
+                unresolved.append(cell)
+        if not split:
+            break
+        cells = []
+        for x0, x1, y0, y1 in split:
+            xm, ym = (x0 + x1) / 2, (y0 + y1) / 2
+            cells += [(x0, xm, y0, ym), (x0, xm, ym, y1), (xm, x1, y0, ym), (xm, x1, ym, y1)]
+        evaluate([(x, y) for cx0, cx1, cy0, cy1 in cells for x in (cx0, cx1) for y in (cy0, cy1)])
+
+    x_values = build_grid(wacc_range[0], wacc_range[1], dense_size)
+    y_values = build_grid(terminal_range[0], terminal_range[1], dense_size)
+    gx, gy = np.meshgrid(np.asarray(x_values), np.asarray(y_values), indexing="ij")
+    exact = np.zeros(gx.shape, dtype=bool)
+    for x0, x1, y0, y1 in unresolved:
+        exact |= (gx >= x0) & (gx <= x1) & (gy >= y0) & (gy <= y1)
+    evaluate(list(zip(gx[exact].tolist(), gy[exact].tolist())))
+
+    grid = _interpolate_cells(samples, np.array(leaves), gx, gy, skip=exact, reciprocal=reciprocal_cells)
+    grid[exact] = [samples[p] for p in zip(gx[exact].tolist(), gy[exact].tolist())]
+    points = np.array(list(samples.keys()))
+    return AdaptiveSensitivity(
+        x=points[:, 0],
+        y=points[:, 1],
+        values=np.array(list(samples.values())),
+        cells=np.array(leaves),
+        dense=SensitivityGrid(x_values=x_values, y_values=y_values, grid=grid),
+        evaluations=len(samples),
+    )
+
+
+def _interpolate_cells(
+    samples: dict[tuple[float, float], float],
+    cells: np.ndarray,
+    gx: np.ndarray,
+    gy: np.ndarray,
+    skip: np.ndarray,
+    reciprocal: set[tuple[float, float, float, float]] | None = None,
+) -> np.ndarray:
+    """Bilinear interpolation of the leaf ``cells`` at points ``(gx, gy)``, leaving ``skip`` points NaN.
+
+    Cells in ``reciprocal`` interpolate ``1 / value`` and invert the result.
+    """
+    reciprocal = reciprocal or set()
+    grid = np.full(gx.shape, np.nan)
+    filled = skip.copy()
+    for x0, x1, y0, y1 in cells:
+        inside = ~filled & (gx >= x0) & (gx <= x1) & (gy >= y0) & (gy <= y1)
+        if not inside.any():
+            continue
+        tx = (gx[inside] - x0) / (x1 - x0)
+        ty = (gy[inside] - y0) / (y1 - y0)
+        f00, f01 = samples[(x0, y0)], samples[(x0, y1)]
+        f10, f11 = samples[(x1, y0)], samples[(x1, y1)]
+        invert = (x0, x1, y0, y1) in reciprocal
+        if invert:
+            f00, f01, f10, f11 = 1 / f00, 1 / f01, 1 / f10, 1 / f11
+        values = f00 * (1 - tx) * (1 - ty) + f10 * tx * (1 - ty) + f01 * (1 - tx) * ty + f11 * tx * ty
+        grid[inside] = 1 / values if invert else values
+        filled |= inside
+    return grid
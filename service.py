@@ -0,0 +1,487 @@
+"""Local asyncio HTTP valuation service with request micro-batching.
+
+Run the server::
+
+    python service.py serve --port 8765
+
+and load-test it from another shell::
+
+    python service.py loadtest --port 8765 --tickers AAPL,MSFT --requests 200 --concurrency 32
+
+Endpoints: ``GET /valuation?ticker=AAPL[&wacc=0.1&exit_multiple=12&growth=0.06&years=5&tax_rate=0.21]``,
+``GET /metrics`` and ``GET /health``. Each request first resolves its company's
+statements on a loader pool, so a cold ticker's SEC download never holds up
+requests for warm ones. Requests are then queued and evaluated together
+through the vectorized DCF and sensitivity paths; when the service is full
+new requests get ``503`` instead of piling up.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from forecast import build_ufcf, forecast_statements, next_forecast_years
+from sensitivity import build_grid
+from valuation_comps import CompInput, comps_valuation
+from valuation_dcf import dcf_valuation_batch, terminal_value_exit_multiple
+
+DEFAULT_PORT = 8765
+SENSITIVITY_SIZE = 7
+
+# Seconds a company's statements are served before their source version is re-checked.
+RELOAD_CHECK_SECONDS = 30.0
+
+
+class Overloaded(Exception):
+    """Raised when the request queue is full."""
+
+
+@dataclass
+class ValuationRequest:
+    ticker: str
+    wacc: float = 0.1
+    exit_multiple: float = 12.0
+    growth: float = 0.06
+    years: int = 5
+    tax_rate: float = 0.21
+
+    @classmethod
+    def from_query(cls, query: Dict[str, List[str]]) -> "ValuationRequest":
+        if "ticker" not in query:
+            raise ValueError("Missing ticker parameter.")
+        values = {"ticker": query["ticker"][0].upper()}
+        for name, cast in (("wacc", float), ("exit_multiple", float), ("growth", float), ("years", int), ("tax_rate", float)):
+            if name in query:
+                values[name] = cast(query[name][0])
+        request = cls(**values)
+        if not 1 <= request.years <= 15:
+            raise ValueError("years must be between 1 and 15.")
+        return request
+
+
+@dataclass
+class CompanyStatements:
+    """Loaded historicals of one ticker and the source version they were loaded at."""
+
+    company: Dict[str, str]
+    historicals: pd.DataFrame
+    version: object
+    checked: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class PreparedValuation:
+    """Per-company forecast output waiting for the batched valuation step."""
+
+    request: ValuationRequest
+    company: Dict[str, str]
+    ufcf: List[float]
+
+
+def load_company_statements(ticker: str) -> Tuple[Dict[str, str], pd.DataFrame]:
+    """ticker -> canonical historicals, using the shared datasets and SEC cache."""
+    from normalize import canonicalize_long_format
+    from shared_data import find_ticker, load_shared_company_facts, shared_ticker_table
+
+    profile = find_ticker(shared_ticker_table(), ticker)
+    if profile is None:
+        raise LookupError(f"Ticker {ticker} not found in SEC mapping.")
+    mapped = load_shared_company_facts(profile.cik)
+    company = {"cik": profile.cik, "ticker": profile.ticker, "name": profile.title}
+    return company, canonicalize_long_format(mapped)
+
+
+def shared_facts_version(company: Dict[str, str]) -> object:
+    """Generation of the company's published normalized-facts partition (``None`` if unpublished)."""
+    from shared_data import NORMALIZED_FACTS, read_manifest
+
+    partitions = read_manifest().get(NORMALIZED_FACTS, {}).get("partitions", {})
+    return partitions.get(company.get("cik"), {}).get("generation")
+
+
+class ServiceMetrics:
+    def __init__(self, window: int = 2048) -> None:
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=window)
+
+    def snapshot(self, queue_depth: int) -> Dict[str, object]:
+        latencies = np.array(self.latencies_ms) if self.latencies_ms else np.array([np.nan])
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime_s": round(uptime, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "queue_depth": queue_depth,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "throughput_rps": self.requests / uptime if uptime else 0.0,
+            "latency_ms": {
+                "p50": float(np.nanpercentile(latencies, 50)),
+                "p95": float(np.nanpercentile(latencies, 95)),
+                "p99": float(np.nanpercentile(latencies, 99)),
+                "max": float(np.nanmax(latencies)),
+            },
+        }
+
+
+@dataclass
+class _Pending:
+    request: ValuationRequest
+    statements: CompanyStatements
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class ValuationService:
+    """Valuation pipeline behind a bounded queue that is drained in micro-batches.
+
+    Statements are loaded per ticker on a pool of ``workers`` threads before a
+    request joins the queue, and batches run on their own thread. At most
+    ``max_statements`` tickers and ``max_forecasts`` forecast paths are kept
+    (least recently used first out). Every ``reload_check_seconds`` a ticker's
+    ``version`` is re-read and its statements reloaded when it moved.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Tuple[Dict[str, str], pd.DataFrame]] = load_company_statements,
+        max_batch: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 1024,
+        workers: int = 4,
+        version: Callable[[Dict[str, str]], object] = shared_facts_version,
+        reload_check_seconds: float = RELOAD_CHECK_SECONDS,
+        max_statements: int = 256,
+        max_forecasts: int = 4096,
+    ) -> None:
+        self.loader = loader
+        self.version = version
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self.reload_check_seconds = reload_check_seconds
+        self.max_statements = max_statements
+        self.max_forecasts = max_forecasts
+        self.metrics = ServiceMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="valuation-load")
+        self._batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="valuation-batch")
+        self._statements: "OrderedDict[str, CompanyStatements]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._admitting = 0
+        self._ufcf: "OrderedDict[Tuple[str, object, float, int, float], List[float]]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._batcher = asyncio.create_task(self._run_batches())
+
+    async def stop(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._batch_executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def queue_depth(self) -> int:
+        return (self._queue.qsize() if self._queue is not None else 0) + self._admitting
+
+    async def value(self, request: ValuationRequest) -> Dict[str, object]:
+        # Requests still resolving statements count against the queue bound.
+        if self.queue_depth >= self.max_queue:
+            self.metrics.rejected += 1
+            raise Overloaded("Valuation queue is full.")
+        self._admitting += 1
+        try:
+            statements = await self._statements_for(request.ticker)
+        finally:
+            self._admitting -= 1
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_Pending(request=request, statements=statements, future=future))
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            raise Overloaded("Valuation queue is full.") from None
+        return await future
+
+    async def _run_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.batches += 1
+            self.metrics.batched_requests += len(batch)
+            try:
+                results = await loop.run_in_executor(
+                    self._batch_executor, self._value_batch, [(p.request, p.statements) for p in batch]
+                )
+            except Exception as exc:  # pragma: no cover - defensive, _value_batch reports per request
+                results = [exc] * len(batch)
+            for pending, result in zip(batch, results):
+                if pending.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    pending.future.set_exception(result)
+                else:
+                    pending.future.set_result(result)
+
+    async def _statements_for(self, ticker: str) -> CompanyStatements:
+        """Cached statements for ``ticker``, loading or re-checking them on the loader pool."""
+        cached = self._statements.get(ticker)
+        if cached is not None and time.monotonic() - cached.checked < self.reload_check_seconds:
+            self._statements.move_to_end(ticker)
+            return cached
+        # Concurrent requests for the same ticker share one load or version check.
+        loading = self._loading.get(ticker)
+        if loading is None:
+            loop = asyncio.get_running_loop()
+            loading = asyncio.ensure_future(loop.run_in_executor(self._executor, self._load, ticker, cached))
+            self._loading[ticker] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(ticker, None))
+        statements = await asyncio.shield(loading)
+        self._statements[ticker] = statements
+        self._statements.move_to_end(ticker)
+        while len(self._statements) > self.max_statements:
+            self._statements.popitem(last=False)
+        return statements
+
+    def _load(self, ticker: str, cached: Optional[CompanyStatements]) -> CompanyStatements:
+        if cached is not None and self.version(cached.company) == cached.version:
+            return CompanyStatements(company=cached.company, historicals=cached.historicals, version=cached.version)
+        company, historicals = self.loader(ticker)
+        return CompanyStatements(company=company, historicals=historicals, version=self.version(company))
+
+    def _prepare(self, request: ValuationRequest, statements: CompanyStatements) -> PreparedValuation:
+        key = (request.ticker, statements.version, request.growth, request.years, request.tax_rate)
+        if key in self._ufcf:
+            self._ufcf.move_to_end(key)
+        else:
+            years = next_forecast_years(statements.historicals, request.years)
+            assumptions = {"revenue_growth": {"path": [request.growth] * request.years}}
+            forecast = forecast_statements(statements.historicals, years, assumptions)
+            self._ufcf[key] = build_ufcf(forecast.forecast, request.tax_rate)["UFCF"].tolist()
+            while len(self._ufcf) > self.max_forecasts:
+                self._ufcf.popitem(last=False)
+        return PreparedValuation(request=request, company=statements.company, ufcf=self._ufcf[key])
+
+    def _value_batch(self, requests: List[Tuple[ValuationRequest, CompanyStatements]]) -> List[object]:
+        prepared: List[object] = []
+        for request, statements in requests:
+            try:
+                prepared.append(self._prepare(request, statements))
+            except Exception as exc:
+                prepared.append(exc)
+
+        results: List[object] = list(prepared)
+        by_horizon: Dict[int, List[int]] = {}
+        for idx, item in enumerate(prepared):
+            if isinstance(item, PreparedValuation):
+                by_horizon.setdefault(len(item.ufcf), []).append(idx)
+
+        for indices in by_horizon.values():
+            items: List[PreparedValuation] = [prepared[i] for i in indices]
+            ufcf = np.array([item.ufcf for item in items])
+            wacc = np.array([item.request.wacc for item in items])
+            multiple = np.array([item.request.exit_multiple for item in items])
+            ebitda_terminal = ufcf[:, -1] * 1.3
+            tv = terminal_value_exit_multiple(ebitda_terminal, multiple)
+            zeros = np.zeros(len(items))
+            dcf = dcf_valuation_batch(ufcf, wacc, tv, zeros, zeros, np.ones(len(items)))
+
+            # One broadcast pass for every request's sensitivity plane.
+            wacc_axis = np.array([build_grid(w - 0.02, w + 0.02, SENSITIVITY_SIZE) for w in wacc])
+            multiple_axis = np.array([build_grid(m - 2, m + 2, SENSITIVITY_SIZE) for m in multiple])
+            shape = (len(items), SENSITIVITY_SIZE, SENSITIVITY_SIZE)
+            grid_tv = np.broadcast_to(ebitda_terminal[:, None, None] * multiple_axis[:, None, :], shape)
+            grid_ufcf = np.broadcast_to(ufcf[:, None, None, :], (*shape, ufcf.shape[1]))
+            grids = dcf_valuation_batch(grid_ufcf, np.broadcast_to(wacc_axis[:, :, None], shape), grid_tv, 0.0, 0.0, 1.0)
+
+            for pos, (idx, item) in enumerate(zip(indices, items)):
+                comps = comps_valuation(
+                    float(ebitda_terminal[pos]), [CompInput(peer="PEER1", multiple_type="EV/EBITDA", multiple=10.0)]
+                )
+                results[idx] = {
+                    **item.company,
+                    "assumptions": item.request.__dict__,
+                    "ufcf": item.ufcf,
+                    "dcf": {key: float(values[pos]) for key, values in dcf.items()},
+                    "comps": {"implied_value": comps.implied_value, "stats": comps.stats},
+                    "sensitivity": {
+                        "wacc": wacc_axis[pos].tolist(),
+                        "exit_multiple": multiple_axis[pos].tolist(),
+                        "share_price": grids["share_price"][pos].tolist(),
+                    },
+                }
+        return results
+
+    async def handle(self, method: str, target: str) -> Tuple[int, Dict[str, object]]:
+        url = urlsplit(target)
+        if method != "GET":
+            return 405, {"error": "Only GET is supported."}
+        if url.path == "/health":
+            return 200, {"status": "ok"}
+        if url.path == "/metrics":
+            return 200, self.metrics.snapshot(self.queue_depth)
+        if url.path != "/valuation":
+            return 404, {"error": f"Unknown path {url.path}."}
+
+        started = time.monotonic()
+        self.metrics.requests += 1
+        try:
+            request = ValuationRequest.from_query(parse_qs(url.query))
+        except ValueError as exc:
+            self.metrics.errors += 1
+            return 400, {"error": str(exc)}
+        try:
+            body = await self.value(request)
+            status = 200
+        except Overloaded as exc:
+            return 503, {"error": str(exc)}
+        except LookupError as exc:
+            self.metrics.errors += 1
+            status, body = 400, {"error": str(exc)}
+        except Exception as exc:
+            self.metrics.errors += 1
+            status, body = 500, {"error": str(exc)}
+        self.metrics.latencies_ms.append((time.monotonic() - started) * 1000.0)
+        return status, body
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+async def _handle_connection(service: ValuationService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.split()
+        if len(parts) < 2:
+            status, body = 400, {"error": "Malformed request line."}
+        else:
+            status, body = await service.handle(parts[0], parts[1])
+        payload = json.dumps(body, default=str).encode()
+        headers = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+            "Connection: close",
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_server(service: ValuationService, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    await service.start()
+    return await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+
+
+async def serve(host: str, port: int, **options) -> None:
+    service = ValuationService(**options)
+    server = await start_server(service, host, port)
+    print(f"Valuation service listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def fetch_json(host: str, port: int, target: str) -> Tuple[int, Dict[str, object]]:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    status = int(head.split()[1])
+    return status, json.loads(body or b"{}")
+
+
+async def load_test(host: str, port: int, tickers: List[str], requests: int, concurrency: int) -> Dict[str, object]:
+    """Fire ``requests`` valuations with at most ``concurrency`` in flight and summarize latency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            status, _ = await fetch_json(host, port, f"/valuation?ticker={tickers[i % len(tickers)]}")
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    _, server_metrics = await fetch_json(host, port, "/metrics")
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "max": float(np.max(latencies)),
+        },
+        "server": server_metrics,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--max-batch", type=int, default=64)
+    serve_parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    serve_parser.add_argument("--max-queue", type=int, default=1024)
+    test_parser = sub.add_parser("loadtest")
+    test_parser.add_argument("--host", default="127.0.0.1")
+    test_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    test_parser.add_argument("--tickers", default="AAPL")
+    test_parser.add_argument("--requests", type=int, default=200)
+    test_parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(
+            serve(args.host, args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue)
+        )
+    else:
+        report = asyncio.run(
+            load_test(args.host, args.port, args.tickers.upper().split(","), args.requests, args.concurrency)
+        )
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Host-wide read-only datasets shared across sessions and worker processes.
+
+Datasets are published once as Arrow IPC files under ``.cache/shared`` and
+attached with memory maps, so every process reads the same pages from the OS
+page cache instead of holding a private parsed copy. Each publish writes a new
+generation file and then swaps the manifest; processes that already attached
+an older generation keep a valid mapping until they reload.
+
+Normalized facts are partitioned by company: each cik has its own file listed
+in the manifest, so publishing or reading one company costs the same however
+many companies the host holds.
+
+    python shared_data.py [--refresh-tickers] [--full]
+
+publishes the ticker index and the normalized facts of the default facts store.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from normalize import FACT_PERIOD_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+    from facts_store import FactsStore
+    from sec_ingest import CompanyProfile
+
+SHARED_DIR = Path(".cache") / "shared"
+MANIFEST_NAME = "manifest.json"
+
+LOCK_NAME = ".lock"
+
+TICKERS = "tickers"
+NORMALIZED_FACTS = "normalized_facts"
+
+# Published ticker tables older than this are refreshed from the SEC on attach.
+TICKER_MAX_AGE_SECONDS = 24 * 3600
+
+_attached: Dict[Tuple[str, str], Tuple[int, "pa.Table"]] = {}
+_lock = threading.Lock()
+
+
+def _manifest_path(directory: Path) -> Path:
+    return directory / MANIFEST_NAME
+
+
+def read_manifest(directory: Optional[Path] = None) -> Dict[str, dict]:
+    path = _manifest_path(directory or SHARED_DIR)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def _write_manifest(directory: Path, manifest: Dict[str, dict]) -> None:
+    tmp_manifest = _manifest_path(directory).with_suffix(f".{os.getpid()}.tmp")
+    tmp_manifest.write_text(json.dumps(manifest, indent=2, default=str))
+    os.replace(tmp_manifest, _manifest_path(directory))
+
+
+@contextmanager
+def _publish_lock(directory: Path) -> Iterator[None]:
+    """Serialize publishers across threads and, where ``fcntl`` exists, processes."""
+    with _lock:
+        try:
+            import fcntl
+        except ImportError:  # pragma: no cover - Windows
+            yield
+            return
+        with open(directory / LOCK_NAME, "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _write_tmp(name: str, df: pd.DataFrame, directory: Path) -> Tuple[Path, int]:
+    """Write ``df`` to a private temporary Arrow file in ``directory``; returns it and its row count."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Write to a private file first; a published generation is never opened for writing,
+    # so a reader that has it mapped cannot see it truncated.
+    tmp = directory / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return tmp, table.num_rows
+
+
+def _drop_old_generations(directory: Path, prefix: str, keep_from: float) -> None:
+    # Readers may still map the previous generation; older ones are dropped.
+    # Unlinking a mapped file is safe on POSIX, the pages stay valid until unmapped.
+    for stale in directory.glob(f"{prefix}.*.arrow"):
+        stale_generation = stale.name[len(prefix) + 1 : -len(".arrow")]
+        if stale_generation.isdigit() and int(stale_generation) < keep_from:
+            stale.unlink(missing_ok=True)
+
+
+def publish(name: str, df: pd.DataFrame, directory: Optional[Path] = None, source_version: object = None) -> Path:
+    """Write ``df`` as a new generation of dataset ``name`` and point the manifest at it."""
+    directory = directory or SHARED_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp, rows = _write_tmp(name, df, directory)
+    with _publish_lock(directory):
+        manifest = read_manifest(directory)
+        previous = manifest.get(name, {})
+        generation = int(previous.get("generation", 0)) + 1
+        path = directory / f"{name}.{generation}.arrow"
+        os.replace(tmp, path)
+        manifest[name] = {
+            "generation": generation,
+            "file": path.name,
+            "rows": rows,
+            "source_version": source_version,
+            "checked_at": time.time(),
+        }
+        _write_manifest(directory, manifest)
+        _drop_old_generations(directory, name, generation - 1)
+    return path
+
+
+def publish_partition(
+    name: str, key: str, df: pd.DataFrame, directory: Optional[Path] = None, source_version: object = None
+) -> Path:
+    """Write ``df`` as a new generation of partition ``key`` of dataset ``name``.
+
+    Only this partition's file and its manifest entry change; other partitions
+    are not read or rewritten.
+    """
+    directory = directory or SHARED_DIR
+    partition_dir = directory / name
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    tmp, rows = _write_tmp(key, df, partition_dir)
+    with _publish_lock(directory):
+        manifest = read_manifest(directory)
+        entry = manifest.get(name)
+        if entry is None or "partitions" not in entry:
+            entry = manifest[name] = {"partitions": {}}
+        previous = entry["partitions"].get(key, {})
+        generation = int(previous.get("generation", 0)) + 1
+        path = partition_dir / f"{key}.{generation}.arrow"
+        os.replace(tmp, path)
+        entry["partitions"][key] = {
+            "generation": generation,
+            "file": f"{name}/{path.name}",
+            "rows": rows,
+            "source_version": source_version,
+        }
+        entry["checked_at"] = time.time()
+        _write_manifest(directory, manifest)
+        _drop_old_generations(partition_dir, key, generation - 1)
+    return path
+
+
+def drop_partitions(name: str, keys: List[str], directory: Optional[Path] = None) -> None:
+    """Remove partitions ``keys`` of dataset ``name`` from the manifest and disk."""
+    directory = directory or SHARED_DIR
+    with _publish_lock(directory):
+        manifest = read_manifest(directory)
+        partitions = manifest.get(name, {}).get("partitions", {})
+        for key in keys:
+            partitions.pop(key, None)
+        _write_manifest(directory, manifest)
+        for key in keys:
+            _drop_old_generations(directory / name, key, float("inf"))
+
+
+def partition_versions(name: str, directory: Optional[Path] = None) -> Dict[str, object]:
+    """Source version of every published partition of ``name``, keyed by partition."""
+    partitions = read_manifest(directory).get(name, {}).get("partitions", {})
+    return {key: entry.get("source_version") for key, entry in partitions.items()}
+
+
+def attach(name: str, directory: Optional[Path] = None) -> Optional["pa.Table"]:
+    """Memory-mapped, zero-copy view of the current generation of ``name``.
+
+    Returns ``None`` if the dataset was never published. The table is cached
+    per process and remapped only when the manifest points at a new generation.
+    """
+    import pyarrow as pa
+
+    directory = directory or SHARED_DIR
+    entry = read_manifest(directory).get(name)
+    if entry is None:
+        return None
+    key = (str(directory), name)
+    with _lock:
+        cached = _attached.get(key)
+        if cached is not None and cached[0] == entry["generation"]:
+            return cached[1]
+        source = pa.memory_map(str(directory / entry["file"]), "r")
+        table = pa.ipc.open_file(source).read_all()
+        _attached[key] = (entry["generation"], table)
+        return table
+
+
+def detach_all() -> None:
+    """Drop this process's mappings; the next ``attach`` maps the current generation."""
+    with _lock:
+        _attached.clear()
+
+
+def attach_partition(name: str, key: str, directory: Optional[Path] = None) -> Optional["pa.Table"]:
+    """Memory-mapped view of the current generation of partition ``key``, or ``None`` if unpublished.
+
+    Partitions are mapped per call rather than cached, so a process that
+    touches many companies does not keep a mapping open for each of them.
+    """
+    import pyarrow as pa
+
+    directory = directory or SHARED_DIR
+    for _ in range(2):
+        entry = read_manifest(directory).get(name, {}).get("partitions", {}).get(key)
+        if entry is None:
+            return None
+        try:
+            source = pa.memory_map(str(directory / entry["file"]), "r")
+        except FileNotFoundError:
+            # Two newer generations were published since the manifest was read; retry once.
+            continue
+        return pa.ipc.open_file(source).read_all()
+    return None
+
+
+def is_stale(name: str, source_version: object, directory: Optional[Path] = None) -> bool:
+    entry = read_manifest(directory).get(name)
+    return entry is None or entry.get("source_version") != json.loads(json.dumps(source_version, default=str))
+
+
+def _mark_checked(name: str, directory: Optional[Path] = None) -> None:
+    """Record that ``name`` was compared with its source and found current."""
+    directory = directory or SHARED_DIR
+    with _publish_lock(directory):
+        manifest = read_manifest(directory)
+        if name in manifest:
+            manifest[name]["checked_at"] = time.time()
+            _write_manifest(directory, manifest)
+
+
+def _ticker_version(mapping: pd.DataFrame) -> str:
+    hashed = pd.util.hash_pandas_object(mapping[["ticker", "cik", "title"]], index=False).to_numpy()
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def publish_ticker_index(mapping: pd.DataFrame, directory: Optional[Path] = None) -> Path:
+    return publish(TICKERS, mapping[["ticker", "cik", "title"]], directory=directory, source_version=_ticker_version(mapping))
+
+
+def refresh_ticker_index(force_refresh: bool = False, directory: Optional[Path] = None) -> bool:
+    """Republish the ticker table if the SEC mapping changed; returns whether it did.
+
+    ``force_refresh`` downloads the mapping instead of reading the local cache.
+    """
+    from sec_ingest import load_ticker_cik_mapping
+
+    mapping = load_ticker_cik_mapping(force_refresh=force_refresh)
+    if not is_stale(TICKERS, _ticker_version(mapping), directory):
+        return False
+    publish_ticker_index(mapping, directory)
+    return True
+
+
+def shared_ticker_table(directory: Optional[Path] = None, max_age: float = TICKER_MAX_AGE_SECONDS) -> "pa.Table":
+    """Attach the shared ticker table, (re)publishing it when missing or older than ``max_age`` seconds."""
+    entry = read_manifest(directory).get(TICKERS)
+    if entry is None:
+        refresh_ticker_index(directory=directory)
+    elif time.time() - float(entry.get("checked_at", 0)) > max_age:
+        try:
+            if not refresh_ticker_index(force_refresh=True, directory=directory):
+                _mark_checked(TICKERS, directory)
+        except Exception as exc:  # keep serving the published table when the SEC is unreachable
+            logger.warning("Ticker index refresh failed, using published table: %s", exc)
+    return attach(TICKERS, directory)
+
+
+def search_ticker_table(table: "pa.Table", query: str, limit: int = 20) -> List["CompanyProfile"]:
+    import pyarrow.compute as pc
+
+    from sec_ingest import CompanyProfile
+
+    matches = table.filter(pc.match_substring(table["ticker"], query.upper())).slice(0, limit)
+    return [CompanyProfile(cik=row["cik"], ticker=row["ticker"], title=row["title"]) for row in matches.to_pylist()]
+
+
+def find_ticker(table: "pa.Table", ticker: str) -> Optional["CompanyProfile"]:
+    """Exact ticker lookup, independent of how many other tickers contain it."""
+    import pyarrow.compute as pc
+
+    from sec_ingest import CompanyProfile
+
+    matches = table.filter(pc.equal(table["ticker"], ticker.upper())).slice(0, 1).to_pylist()
+    if not matches:
+        return None
+    row = matches[0]
+    return CompanyProfile(cik=row["cik"], ticker=row["ticker"], title=row["title"])
+
+
+NORMALIZED_COLUMNS = [
+    "statement",
+    "line_item",
+    "year",
+    "value",
+    "source_tag",
+    "source_taxonomy",
+    "accn",
+    "fact_id",
+    *FACT_PERIOD_COLUMNS,
+    "cik",
+]
+
+
+def _normalized_company(store: "FactsStore", cik: str) -> pd.DataFrame:
+    from normalize import canonicalize_long_format, map_facts_to_statements
+
+    mapped = map_facts_to_statements(store.load_company(cik))
+    if mapped.empty:
+        return pd.DataFrame(columns=NORMALIZED_COLUMNS)
+    return canonicalize_long_format(mapped).assign(cik=cik)
+
+
+def publish_company_facts(store: "FactsStore", cik: str, directory: Optional[Path] = None) -> Path:
+    """Normalize and publish one company's partition; cost does not depend on the store's size."""
+    version = store.company_version(cik)
+    return publish_partition(NORMALIZED_FACTS, cik, _normalized_company(store, cik), directory, source_version=version)
+
+
+def publish_normalized_facts(store: "FactsStore", directory: Optional[Path] = None) -> None:
+    """Republish canonical long statements for every company in ``store``, dropping any others."""
+    versions = store.company_versions()
+    for cik in versions:
+        publish_company_facts(store, cik, directory)
+    removed = [cik for cik in partition_versions(NORMALIZED_FACTS, directory) if cik not in versions]
+    if removed:
+        drop_partitions(NORMALIZED_FACTS, removed, directory)
+
+
+def refresh_normalized_facts(store: "FactsStore", directory: Optional[Path] = None) -> bool:
+    """Republish the partitions of companies whose store version moved; returns whether any did.
+
+    Unchanged companies are not read; partitions of companies no longer in
+    the store are dropped.
+    """
+    versions = store.company_versions()
+    published = partition_versions(NORMALIZED_FACTS, directory)
+    changed = [cik for cik, version in versions.items() if published.get(cik) != version]
+    removed = [cik for cik in published if cik not in versions]
+    for cik in changed:
+        publish_company_facts(store, cik, directory)
+    if removed:
+        drop_partitions(NORMALIZED_FACTS, removed, directory)
+    return bool(changed or removed)
+
+
+def shared_company_facts(cik: str, directory: Optional[Path] = None) -> Optional[pd.DataFrame]:
+    """Normalized facts for ``cik`` from its shared partition, or ``None`` if not published."""
+    table = attach_partition(NORMALIZED_FACTS, cik, directory)
+    if table is None or table.num_rows == 0:
+        return None
+    return table.to_pandas()
+
+
+def load_shared_company_facts(
+    cik: str, store: Optional["FactsStore"] = None, directory: Optional[Path] = None
+) -> pd.DataFrame:
+    """Normalized facts for ``cik``, publishing them for other sessions on first use.
+
+    On a miss the company is loaded into the facts store (downloading
+    companyfacts if it is not stored yet) and only its own partition is
+    published; other companies are neither read nor rewritten.
+    """
+    shared = shared_company_facts(cik, directory)
+    if shared is None:
+        from facts_store import FactsStore
+        from normalize import map_facts_to_statements
+        from sec_ingest import load_company_facts_frame
+
+        owned = store is None
+        store = store or FactsStore()
+        try:
+            flat = load_company_facts_frame(cik, store)
+            publish_company_facts(store, cik, directory)
+        finally:
+            if owned:
+                store.close()
+        shared = shared_company_facts(cik, directory)
+        if shared is None:
+            return map_facts_to_statements(flat)
+    return shared.drop(columns=["cik"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Publish the shared ticker index and normalized facts.")
+    parser.add_argument("--refresh-tickers", action="store_true", help="download the SEC ticker mapping first")
+    parser.add_argument("--full", action="store_true", help="republish every company, not only changed ones")
+    parser.add_argument("--directory", type=Path, default=SHARED_DIR)
+    args = parser.parse_args()
+
+    from facts_store import FactsStore
+
+    tickers = refresh_ticker_index(force_refresh=args.refresh_tickers, directory=args.directory)
+    with FactsStore() as store:
+        if args.full:
+            publish_normalized_facts(store, args.directory)
+            facts = True
+        else:
+            facts = refresh_normalized_facts(store, args.directory)
+    manifest = read_manifest(args.directory)
+    ticker_entry = manifest.get(TICKERS, {})
+    partitions = manifest.get(NORMALIZED_FACTS, {}).get("partitions", {})
+    print(f"{TICKERS}: {'published' if tickers else 'unchanged'} generation={ticker_entry.get('generation')} "
+          f"rows={ticker_entry.get('rows')}")
+    print(f"{NORMALIZED_FACTS}: {'published' if facts else 'unchanged'} companies={len(partitions)} "
+          f"rows={sum(int(entry.get('rows', 0)) for entry in partitions.values())}")
+
+
+if __name__ == "__main__":
+    main()
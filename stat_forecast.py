@@ -0,0 +1,169 @@
+"""Batched statistical forecasts fitted to many series at once.
+
+Series are rows of a 2-D array (series x consecutive periods, NaN for missing
+years). Every estimator works on the whole array with NumPy, so thousands of
+line items and companies are fitted in one call instead of one model object per
+series. The panel helpers reindex year columns to a continuous range first, so
+a gap in the years is a missing period rather than a shorter time step.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+Z_95 = 1.959964
+
+# Smoothing parameter grid searched per series for the damped trend.
+DAMPED_ALPHAS = (0.2, 0.5, 0.8)
+DAMPED_BETAS = (0.1, 0.3)
+DAMPED_PHIS = (0.8, 0.9, 0.98)
+
+
+@dataclass
+class BatchForecast:
+    point: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def log_linear_trend(values: np.ndarray, horizon: int, z: float = Z_95) -> BatchForecast:
+    """Closed-form OLS of ``log(value)`` on time for every row.
+
+    Rows with fewer than two positive observations forecast NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    n_series, n_periods = values.shape
+    x = np.arange(n_periods, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y = np.where(values > 0, np.log(values), np.nan)
+    mask = ~np.isnan(y)
+    n = mask.sum(axis=1).astype(float)
+    xm = np.where(mask, x, 0.0)
+    ym = np.where(mask, y, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_bar = xm.sum(axis=1) / n
+        y_bar = ym.sum(axis=1) / n
+        dx = np.where(mask, x - x_bar[:, None], 0.0)
+        sxx = (dx**2).sum(axis=1)
+        slope = (dx * np.where(mask, y - y_bar[:, None], 0.0)).sum(axis=1) / sxx
+        intercept = y_bar - slope * x_bar
+        resid = np.where(mask, y - (intercept[:, None] + slope[:, None] * x), 0.0)
+        sigma = np.sqrt((resid**2).sum(axis=1) / np.maximum(n - 2, 1))
+        sigma = np.where(n > 2, sigma, 0.0)
+
+        future_x = n_periods - 1 + np.arange(1, horizon + 1, dtype=float)
+        log_point = intercept[:, None] + slope[:, None] * future_x
+        spread = sigma[:, None] * np.sqrt(1 + 1 / n[:, None] + (future_x - x_bar[:, None]) ** 2 / sxx[:, None])
+    valid = (n >= 2)[:, None]
+    point = np.where(valid, np.exp(log_point), np.nan)
+    lower = np.where(valid, np.exp(log_point - z * spread), np.nan)
+    upper = np.where(valid, np.exp(log_point + z * spread), np.nan)
+    return BatchForecast(point=point, lower=lower, upper=upper)
+
+
+def _damped_pass(values: np.ndarray, alpha: np.ndarray, beta: np.ndarray, phi: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Run Holt's damped recursion over time for a stack of (series x params) rows."""
+    n_rows, n_periods = values.shape
+    level = np.full(n_rows, np.nan)
+    trend = np.zeros(n_rows)
+    sse = np.zeros(n_rows)
+    count = np.zeros(n_rows)
+    seeded = np.zeros(n_rows, dtype=bool)
+    for t in range(n_periods):
+        obs = values[:, t]
+        has_obs = ~np.isnan(obs)
+        started = ~np.isnan(level)
+        first = has_obs & ~started
+        level = np.where(first, obs, level)
+
+        # The second observation seeds the trend instead of being scored.
+        seed = has_obs & started & ~seeded
+        trend = np.where(seed, obs - level, trend)
+        level = np.where(seed, obs, level)
+        seeded |= seed
+
+        update = has_obs & started & ~seed
+        forecast = level + phi * trend
+        error = np.where(update, obs - forecast, 0.0)
+        sse += error**2
+        count += update
+        new_level = forecast + alpha * error
+        new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        # Periods without an observation only damp the trend forward.
+        level = np.where(update, new_level, np.where(started & ~has_obs, forecast, level))
+        trend = np.where(started, np.where(update, new_trend, phi * trend), trend)
+    return level, trend, sse, count
+
+
+def damped_trend(values: np.ndarray, horizon: int, z: float = Z_95) -> BatchForecast:
+    """Damped-trend exponential smoothing, parameters chosen per row by in-sample SSE."""
+    values = np.asarray(values, dtype=float)
+    n_series = values.shape[0]
+    grid = np.array([(a, b, p) for a in DAMPED_ALPHAS for b in DAMPED_BETAS for p in DAMPED_PHIS])
+    n_params = len(grid)
+    stacked = np.repeat(values, n_params, axis=0)
+    alpha = np.tile(grid[:, 0], n_series)
+    beta = np.tile(grid[:, 1], n_series)
+    phi = np.tile(grid[:, 2], n_series)
+    level, trend, sse, count = _damped_pass(stacked, alpha, beta, phi)
+
+    best = np.argmin(sse.reshape(n_series, n_params), axis=1)
+    pick = np.arange(n_series) * n_params + best
+    level, trend, sse, count, alpha, beta, phi = (arr[pick] for arr in (level, trend, sse, count, alpha, beta, phi))
+
+    steps = np.arange(1, horizon + 1)
+    damp = np.cumsum(phi[:, None] ** steps[None, :], axis=1)
+    point = level[:, None] + damp * trend[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.where(count > 1, np.sqrt(sse / np.maximum(count - 1, 1)), 0.0)
+    # Approximate forecast variance growth of additive damped-trend smoothing.
+    growth = 1 + np.cumsum((alpha[:, None] * (1 + beta[:, None] * damp)) ** 2, axis=1) - (
+        alpha[:, None] * (1 + beta[:, None] * damp)
+    ) ** 2
+    spread = sigma[:, None] * np.sqrt(growth)
+    return BatchForecast(point=point, lower=point - z * spread, upper=point + z * spread)
+
+
+ESTIMATORS = {
+    "damped_trend": damped_trend,
+    "log_linear": log_linear_trend,
+}
+
+
+def continuous_years(wide: pd.DataFrame) -> pd.DataFrame:
+    """``wide`` with one column per calendar year from the first to the last, NaN where missing."""
+    if wide.columns.empty:
+        return wide
+    years = wide.columns.astype(int)
+    return wide.set_axis(years, axis=1).reindex(columns=range(years.min(), years.max() + 1))
+
+
+def forecast_panel(wide: pd.DataFrame, method: str, horizon: int) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Fit ``method`` to every row of ``wide`` (series x year columns).
+
+    Returns point, lower and upper frames indexed like ``wide`` with columns
+    ``1..horizon``: years after the last year column.
+    """
+    result = ESTIMATORS[method](continuous_years(wide).to_numpy(dtype=float), horizon)
+    columns: List[int] = list(range(1, horizon + 1))
+    return tuple(pd.DataFrame(arr, index=wide.index, columns=columns) for arr in (result.point, result.lower, result.upper))
+
+
+def forecast_long(df: pd.DataFrame, method: str, horizon: int, keys: Tuple[str, ...] = ("cik", "line_item")) -> pd.DataFrame:
+    """Statistical forecast for every series of a canonical long frame.
+
+    ``df`` holds ``year`` and ``value`` plus the series ``keys`` (for example
+    ``cik`` and ``line_item``). Returns one row per series and step with
+    ``step``, ``value``, ``lower`` and ``upper``.
+    """
+    wide = continuous_years(df.pivot_table(index=list(keys), columns="year", values="value", aggfunc="mean"))
+    result = ESTIMATORS[method](wide.to_numpy(dtype=float), horizon)
+    out = wide.index.to_frame(index=False).loc[np.repeat(np.arange(len(wide)), horizon)].reset_index(drop=True)
+    out["step"] = np.tile(np.arange(1, horizon + 1), len(wide))
+    out["value"] = result.point.ravel()
+    out["lower"] = result.lower.ravel()
+    out["upper"] = result.upper.ravel()
+    return out
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import ai_advisor
+from ai_advisor import ai_enhance_recommendations, build_recommendations
+
+try:
+    import openai  # noqa: F401
+except ImportError:  # pragma: no cover - optional dependency
+    openai = None
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    calls = 0
+
+    def do_POST(self):
+        type(self).calls += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.delay)
+        text = json.dumps({"enhanced": True})
+        body = json.dumps(
+            {
+                "id": "resp_stub",
+                "object": "response",
+                "created_at": 0,
+                "model": "stub",
+                "status": "completed",
+                "output": [
+                    {
+                        "type": "message",
+                        "id": "msg_stub",
+                        "role": "assistant",
+                        "status": "completed",
+                        "content": [{"type": "output_text", "text": text, "annotations": []}],
+                    }
+                ],
+                "parallel_tool_calls": False,
+                "tool_choice": "auto",
+                "tools": [],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(openai is None, "openai not installed")
+class TestAIAdvisor(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        _StubHandler.delay = 0.0
+        _StubHandler.calls = 0
+        ai_advisor.enhancement_cache.clear()
+        env = {"OPENAI_API_KEY": "test", "OPENAI_BASE_URL": f"http://127.0.0.1:{self.server.server_port}/v1"}
+        self.env = mock.patch.dict(os.environ, env)
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_enhanced_payload_is_cached(self):
+        base = build_recommendations({"stage": "Mature"}, {"gross_margin": 0.4})
+        self.assertEqual(ai_enhance_recommendations(base), {"enhanced": True})
+        self.assertEqual(ai_enhance_recommendations(base), {"enhanced": True})
+        self.assertEqual(_StubHandler.calls, 1)
+
+    def test_timeout_falls_back_to_base_payload(self):
+        _StubHandler.delay = 0.5
+        base = build_recommendations({"stage": "High growth"}, {"gross_margin": 0.6})
+        self.assertIs(ai_enhance_recommendations(base, timeout=0.1), base)
+
+    def test_late_answer_is_cached(self):
+        _StubHandler.delay = 0.5
+        base = build_recommendations({"stage": "Cyclical"}, {"gross_margin": 0.3})
+        self.assertIs(ai_enhance_recommendations(base, timeout=0.2), base)
+        deadline = time.monotonic() + 5.0
+        while ai_advisor.enhancement_cache.get(ai_advisor.payload_key(base)) is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(ai_enhance_recommendations(base, timeout=0.2), {"enhanced": True})
+        self.assertEqual(_StubHandler.calls, 1)
+
+    def test_answer_is_cached_before_leaving_inflight(self):
+        base = build_recommendations({"stage": "Turnaround"}, {"gross_margin": 0.2})
+        key = ai_advisor.payload_key(base)
+        still_inflight = []
+        put = ai_advisor.enhancement_cache.put
+
+        def recording_put(cache_key, value):
+            with ai_advisor._inflight_lock:
+                still_inflight.append(cache_key in ai_advisor._inflight)
+            put(cache_key, value)
+
+        with mock.patch.object(ai_advisor.enhancement_cache, "put", side_effect=recording_put):
+            self.assertEqual(ai_advisor.submit_enhancement(base).result(timeout=5.0), {"enhanced": True})
+        self.assertEqual(still_inflight, [True])
+        self.assertNotIn(key, ai_advisor._inflight)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+
+import pandas as pd
+
+from export_columnar import FACT_REFERENCE_COLUMNS, export_run, facts_reference, read_run
+from facts_store import FactsStore
+from forecast import build_ufcf, forecast_statements
+from normalize import canonicalize_long_format, map_facts_to_statements
+from sec_ingest import flatten_company_facts
+
+
+def _flat():
+    rows = []
+    for year, revenue in ((2022, 100.0), (2023, 110.0)):
+        for tag, value in (("Revenues", revenue), ("OperatingIncomeLoss", revenue * 0.2), ("Assets", revenue * 2)):
+            rows.append({"taxonomy": "us-gaap", "tag": tag, "unit": "USD", "value": value, "fy": year,
+                         "accn": f"accn-{year}", "filed": f"{year + 1}-02-01"})
+    return pd.DataFrame(rows)
+
+
+class TestColumnarExport(unittest.TestCase):
+    def test_export_with_lineage(self):
+        mapped = map_facts_to_statements(_flat())
+        hist = canonicalize_long_format(mapped)
+        result = forecast_statements(hist, [2024, 2025], {"revenue_growth": {"path": [0.05, 0.05]}})
+        ufcf = build_ufcf(result.forecast, 0.21)
+        sens = pd.DataFrame([[1.0, 2.0], [3.0, 4.0]], index=[0.09, 0.11], columns=[10.0, 12.0])
+        valuation = {"Valuation – DCF": pd.DataFrame([{"enterprise_value": 1.0, "share_price": 1.0}])}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            export_run(tmp, hist, result.forecast, ufcf, sens, valuation, mapped, {"ticker": "TEST"})
+            run = read_run(tmp)
+
+        self.assertEqual(run["facts"].num_rows, 6)
+        self.assertEqual(run["facts"].column_names, FACT_REFERENCE_COLUMNS)
+        self.assertEqual(run["sensitivity"].num_rows, 4)
+        lineage = run["lineage"].to_pandas()
+        revenue_facts = lineage[(lineage["artifact"] == "statements") & (lineage["line_item"] == "Revenue")]
+        facts = run["facts"].to_pandas().set_index("fact_id")
+        self.assertEqual(set(facts.loc[revenue_facts["fact_id"].astype(int), "accn"]), {"accn-2022", "accn-2023"})
+        op_sources = lineage[(lineage["artifact"] == "forecast") & (lineage["line_item"] == "Operating income")]
+        self.assertEqual(set(op_sources["source_line_item"]), {"Operating income", "Revenue"})
+
+    def test_fact_ids_are_stable_and_period_specific(self):
+        # One 10-K reporting the current year and two prior-year comparatives.
+        items = [
+            {"val": value, "fy": 2021, "fp": "FY", "form": "10-K", "filed": "2022-02-01", "accn": "acc2021",
+             "start": f"{year}-01-01", "end": f"{year}-12-31", "frame": f"CY{year}"}
+            for year, value in ((2019, 80.0), (2020, 90.0), (2021, 100.0))
+        ]
+        payload = {"facts": {"us-gaap": {"Revenues": {"units": {"USD": items}}}}}
+        flat = flatten_company_facts(payload)
+        from_json = map_facts_to_statements(flat)
+
+        store = FactsStore(":memory:")
+        store.replace_company("1", flat.iloc[::-1])
+        from_store = map_facts_to_statements(store.load_company("1"))
+
+        self.assertEqual(from_json["fact_id"].nunique(), 3)
+        self.assertEqual(sorted(from_json["fact_id"]), sorted(from_store["fact_id"]))
+        facts = facts_reference(from_json)
+        self.assertEqual(len(facts), 3)
+        by_end = facts.set_index("end")
+        self.assertEqual(by_end.loc["2019-12-31", "frame"], "CY2019")
+        self.assertEqual(set(facts["accn"]), {"acc2021"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import pandas as pd
+
+from facts_store import FactsStore
+from normalize import cross_sectional_frame
+
+
+def _flat(values):
+    return pd.DataFrame(
+        [
+            {"taxonomy": "us-gaap", "tag": tag, "unit": "USD", "value": value, "fy": 2023, "fp": "FY",
+             "form": "10-K", "filed": filed, "end": "2023-12-31", "start": "2023-01-01", "accn": accn, "frame": "CY2023"}
+            for tag, value, filed, accn in values
+        ]
+    )
+
+
+class TestFactsStore(unittest.TestCase):
+    def test_company_and_frame_queries(self):
+        store = FactsStore(":memory:")
+        store.replace_company("0000000001", _flat([("Revenues", 100.0, "2024-02-01", "a1")]))
+        store.replace_company(
+            "0000000002",
+            _flat([("RevenueFromContractWithCustomerExcludingAssessedTax", 250.0, "2024-02-01", "b1"),
+                   ("NetIncomeLoss", 20.0, "2024-02-01", "b1")]),
+        )
+        self.assertEqual(store.companies(), ["0000000001", "0000000002"])
+        self.assertEqual(len(store.load_company("0000000002", tags=["NetIncomeLoss"])), 1)
+        self.assertEqual(len(store.load_company("0000000002", years=[2022])), 0)
+
+        frame = cross_sectional_frame(store, "Revenue", "CY2023")
+        self.assertEqual(sorted(frame["value"].tolist()), [100.0, 250.0])
+
+        store.replace_company("0000000001", _flat([("Revenues", 110.0, "2024-03-01", "a2")]))
+        self.assertEqual(store.load_company("0000000001")["value"].tolist(), [110.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
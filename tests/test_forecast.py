@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from forecast import forecast_statements
+from sample_generator import generate_synthetic_statements
+from stat_forecast import forecast_long, log_linear_trend
+
+
+class TestForecast(unittest.TestCase):
+    def test_log_linear_recovers_growth(self):
+        values = np.array([[100 * 1.1**t for t in range(6)], [np.nan, 50, 50, 50, 50, 50]])
+        result = log_linear_trend(values, 2)
+        np.testing.assert_allclose(result.point[0], [100 * 1.1**6, 100 * 1.1**7])
+        np.testing.assert_allclose(result.point[1], [50, 50])
+        np.testing.assert_allclose(result.lower[0], result.upper[0])
+
+    def test_methods_per_driver_family(self):
+        hist = generate_synthetic_statements([2019, 2020, 2021, 2022, 2023])
+        result = forecast_statements(
+            hist, [2024, 2025], {"revenue_growth": {"path": [0.05, 0.05]}}, methods={"fixed": "damped_trend"}
+        )
+        capex = result.forecast[result.forecast["line_item"] == "Capex"]
+        self.assertTrue((capex["forecast_method"] == "fixed:damped_trend").all())
+        self.assertTrue((capex["lower"] <= capex["value"]).all() and (capex["value"] <= capex["upper"]).all())
+        revenue = result.forecast[result.forecast["line_item"] == "Revenue"]
+        self.assertTrue(revenue["lower"].isna().all())
+        with self.assertRaises(ValueError):
+            forecast_statements(hist, [2024], {}, methods={"fixed": "arima"})
+
+    def test_batch_fit_many_series(self):
+        rng = np.random.default_rng(0)
+        n_series, years = 5000, list(range(2014, 2024))
+        df = pd.DataFrame(
+            {
+                "cik": np.repeat(np.arange(n_series) // 10, len(years)).astype(str),
+                "line_item": np.repeat(np.arange(n_series) % 10, len(years)).astype(str),
+                "year": np.tile(years, n_series),
+                "value": rng.uniform(50, 150, n_series * len(years)),
+            }
+        )
+        out = forecast_long(df, "damped_trend", 5)
+        self.assertEqual(len(out), n_series * 5)
+        self.assertTrue(np.isfinite(out["value"]).all())
+
+    def test_missing_years_keep_calendar_spacing(self):
+        years = [2019, 2020, 2023]
+        df = pd.DataFrame({"cik": "1", "line_item": "Revenue", "year": years, "value": [100 * 1.1 ** (y - 2019) for y in years]})
+        out = forecast_long(df, "log_linear", 2)
+        np.testing.assert_allclose(out["value"], [100 * 1.1**5, 100 * 1.1**6])
+
+        # Last historical year 2022: forecasting 2024 is two steps ahead.
+        hist_years = [2019, 2020, 2022]
+        capex = [100 * 1.1 ** (y - 2019) for y in hist_years]
+        hist = pd.DataFrame({"statement": "CF", "line_item": "Capex", "year": hist_years, "value": capex})
+        hist = pd.concat([hist, hist.assign(statement="IS", line_item="Revenue")], ignore_index=True)
+        result = forecast_statements(hist, [2024], {}, methods={"fixed": "log_linear"})
+        fitted = result.forecast.query("line_item == 'Capex'")["value"].iloc[0]
+        self.assertAlmostEqual(fitted, 100 * 1.1**5)
+
+    def test_rule_and_statistical_paths_share_calendar_years(self):
+        hist = generate_synthetic_statements([2020, 2021, 2022, 2023])
+        last_revenue = hist.query("line_item == 'Revenue' and year == 2023")["value"].iloc[0]
+        result = forecast_statements(hist, [2024, 2026], {"revenue_growth": {"path": [0.1, 0.1]}}, methods={"fixed": "log_linear"})
+        revenue = result.forecast.query("line_item == 'Revenue'").set_index("year")["value"]
+        self.assertAlmostEqual(revenue[2026], last_revenue * 1.1**3)
+        capex = result.forecast.query("line_item == 'Capex'").set_index("year")["value"]
+        stepped = forecast_statements(hist, [2024, 2025, 2026], {}, methods={"fixed": "log_linear"})
+        self.assertAlmostEqual(capex[2026], stepped.forecast.query("line_item == 'Capex' and year == 2026")["value"].iloc[0])
+
+        with self.assertRaisesRegex(ValueError, "last historical year 2023"):
+            forecast_statements(hist, [2023, 2024, 2025], {}, methods={"fixed": "log_linear"})
+
+
+if __name__ == "__main__":
+    unittest.main()
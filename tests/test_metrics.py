@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from metrics import MetricsStore, compute_history_metrics
+from sample_generator import generate_synthetic_statements
+
+
+class TestMetrics(unittest.TestCase):
+    def test_vectorized_metrics(self):
+        df = generate_synthetic_statements([2020, 2021, 2022, 2023])
+        metrics = compute_history_metrics(df).loc[""]
+        self.assertAlmostEqual(metrics["gross_margin"], 0.6)
+        self.assertAlmostEqual(metrics["operating_margin"], 0.2)
+        self.assertAlmostEqual(metrics["revenue_cagr"], 0.05)
+        self.assertAlmostEqual(metrics["revenue_growth_volatility"], 0.0)
+        self.assertEqual(metrics["as_of_year"], 2023)
+
+    def test_incremental_update(self):
+        store = MetricsStore(":memory:")
+        history = generate_synthetic_statements([2020, 2021, 2022])
+        self.assertEqual(store.update(history.assign(cik="A")), ["A"])
+        self.assertEqual(store.update(history.assign(cik="A")), [])
+        newer = generate_synthetic_statements([2020, 2021, 2022, 2023]).assign(cik="A")
+        both = pd.concat([newer, history.assign(cik="B")], ignore_index=True)
+        self.assertEqual(store.update(both), ["A", "B"])
+        self.assertEqual(store.get("A")["as_of_year"], 2023)
+        self.assertAlmostEqual(store.get("B")["net_margin"], 0.15)
+
+    def test_reopened_store_reads_single_company(self):
+        history = generate_synthetic_statements([2020, 2021, 2022])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "facts.sqlite"
+            writer = MetricsStore(path)
+            writer.update(pd.concat([history.assign(cik="A"), history.assign(cik="B")], ignore_index=True))
+            writer.close()
+
+            reader = MetricsStore(path)
+            self.assertEqual(reader.get("A")["as_of_year"], 2022)
+            self.assertIsNone(reader.get("C"))
+            self.assertEqual(reader.update(history.assign(cik="B")), [])
+            reader.close()
+
+    def test_amended_history_and_foreign_invalidation(self):
+        history = generate_synthetic_statements([2020, 2021, 2022]).assign(cik="A")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "facts.sqlite"
+            store = MetricsStore(path)
+            self.assertAlmostEqual(store.get_or_compute("A", history)["gross_margin"], 0.6)
+
+            # Restated cost of revenue for existing years recomputes without a new year.
+            amended = history.copy()
+            cost = amended["line_item"] == "Cost of revenue"
+            amended.loc[cost, "value"] = amended.loc[cost, "value"] * 2
+            self.assertAlmostEqual(store.get_or_compute("A", amended)["gross_margin"], 0.2)
+
+            # An invalidation from another instance (e.g. a refresh process) is seen.
+            other = MetricsStore(path)
+            other.invalidate(["A"])
+            other.close()
+            self.assertIsNone(store.get("A"))
+            self.assertEqual(store.update(amended), ["A"])
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import pandas as pd
+
+from quarterly import build_quarterly_series, ttm_statements
+
+
+def _fact(tag, value, start, end, fp, filed="2024-01-01"):
+    return {"cik": "1", "tag": tag, "unit": "USD", "value": value, "start": start, "end": end,
+            "fp": fp, "fy": 2023, "filed": filed, "accn": "a"}
+
+
+class TestQuarterly(unittest.TestCase):
+    def test_q4_derivation_and_ttm(self):
+        facts = pd.DataFrame(
+            [
+                _fact("Revenues", 10.0, "2022-10-01", "2022-12-31", "Q4"),
+                _fact("Revenues", 20.0, "2023-01-01", "2023-03-31", "Q1"),
+                _fact("Revenues", 25.0, "2023-04-01", "2023-06-30", "Q2"),
+                _fact("Revenues", 45.0, "2023-01-01", "2023-06-30", "Q2"),  # year-to-date, ignored
+                _fact("Revenues", 30.0, "2023-07-01", "2023-09-30", "Q3"),
+                _fact("Revenues", 110.0, "2023-01-01", "2023-12-31", "FY"),
+                _fact("Assets", 500.0, None, "2023-09-30", "Q3"),
+                _fact("Assets", 520.0, None, "2023-12-31", "FY"),
+            ]
+        )
+        quarterly = build_quarterly_series(facts)
+        revenue = quarterly[quarterly["tag"] == "Revenues"].set_index("end")
+        self.assertEqual(len(revenue), 5)
+        self.assertEqual(revenue.loc["2023-12-31", "value"], 35.0)
+        self.assertTrue(revenue.loc["2023-12-31", "derived"])
+        self.assertEqual(revenue.loc["2023-09-30", "ttm"], 85.0)
+        self.assertEqual(revenue.loc["2023-12-31", "ttm"], 110.0)
+        self.assertTrue(pd.isna(revenue.loc["2023-06-30", "ttm"]))
+
+        ttm = ttm_statements(quarterly).set_index("line_item")
+        self.assertEqual(ttm.loc["Revenue", "value"], 110.0)
+        self.assertEqual(ttm.loc["Total assets", "value"], 520.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
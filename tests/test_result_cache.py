@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from forecast import forecast_statements
+from result_cache import DCF, FORECAST, SENSITIVITY, ResultCache, diff_dcf, result_key
+from sample_generator import generate_synthetic_statements
+from sensitivity import dcf_sensitivity
+from valuation_dcf import DCFInputs, dcf_valuation
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self._tmp.name)
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def test_forecast_hit_and_key_normalization(self):
+        hist = generate_synthetic_statements([2021, 2022, 2023])
+        calls = []
+
+        def run(growth):
+            assumptions = {"revenue_growth": {"path": [growth, growth]}}
+            return self.cache.get_or_compute(
+                FORECAST,
+                lambda: calls.append(growth) or forecast_statements(hist, [2024, 2025], assumptions),
+                cik="A",
+                historicals=hist,
+                years=[2024, 2025],
+                assumptions=assumptions,
+            )
+
+        first = run(0.05)
+        again = run(0.05)
+        self.assertEqual(calls, [0.05])
+        self.assertTrue(first.forecast.equals(again.forecast))
+        # Row order of the historicals does not change the key.
+        shuffled = hist.sample(frac=1.0, random_state=0)
+        self.assertEqual(result_key(FORECAST, historicals=hist), result_key(FORECAST, historicals=shuffled))
+
+        second = run(0.10)
+        keys = self.cache.entries(cik="A", kind=FORECAST)["key"].tolist()
+        self.assertEqual(len(keys), 2)
+        diff = self.cache.diff(keys[1], keys[0])
+        revenue = diff[(diff["line_item"] == "Revenue") & (diff["year"] == 2025)].iloc[0]
+        self.assertAlmostEqual(revenue["value_b"], second.forecast.query("line_item == 'Revenue' and year == 2025")["value"].iloc[0])
+        self.assertGreater(revenue["delta"], 0)
+
+    def test_dcf_and_grid_diff(self):
+        base = DCFInputs(ufcf=[100, 110], wacc=0.1, terminal_method="exit_multiple", terminal_value=1000, debt=0, cash=0, shares=1)
+        cheaper = DCFInputs(**{**base.__dict__, "wacc": 0.09})
+        a = self.cache.get_or_compute(DCF, lambda: dcf_valuation(base), inputs=base)
+        b = self.cache.get_or_compute(DCF, lambda: dcf_valuation(cheaper), inputs=cheaper)
+        self.assertGreater(diff_dcf(a, b)["share_price"]["delta"], 0)
+
+        grids = [
+            self.cache.get_or_compute(
+                SENSITIVITY,
+                lambda inputs=inputs: dcf_sensitivity(inputs, (0.08, 0.12), (8, 12), 5, "exit_multiple"),
+                inputs=inputs,
+                size=5,
+            )
+            for inputs in (base, cheaper)
+        ]
+        keys = self.cache.entries(kind=SENSITIVITY)["key"].tolist()
+        delta = self.cache.diff(keys[1], keys[0])
+        np.testing.assert_allclose(delta.grid, grids[1].grid - grids[0].grid)
+
+    def test_every_call_parameter_changes_key(self):
+        base = DCFInputs(ufcf=[100, 110], wacc=0.1, terminal_method="exit_multiple", terminal_value=1000, debt=0, cash=0, shares=1)
+        params = {"inputs": base, "wacc_range": (0.08, 0.12), "terminal_range": (8, 12), "adaptive": True, "dense_size": 21}
+        key = result_key(SENSITIVITY, **params, terminal_method="exit_multiple", metric="share_price")
+        variants = [
+            result_key(SENSITIVITY, **{**params, "dense_size": 41}, terminal_method="exit_multiple", metric="share_price"),
+            result_key(SENSITIVITY, **params, terminal_method="gordon", metric="share_price"),
+            result_key(SENSITIVITY, **params, terminal_method="exit_multiple", metric="enterprise_value"),
+        ]
+        self.assertEqual(len({key, *variants}), 4)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(self._tmp.name + "/lru", max_entries=2)
+        for i in range(3):
+            cache.put(f"k{i}", i, DCF)
+            if i == 1:
+                cache.get("k0")
+        self.assertEqual(cache.get("k0"), 0)
+        self.assertIsNone(cache.get("k1"))
+        self.assertEqual(cache.get("k2"), 2)
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+import sec_ingest
+from facts_store import FactsStore
+from sec_ingest import refresh_company_facts
+
+
+def _payload(*items):
+    return {
+        "facts": {
+            "us-gaap": {
+                "Revenues": {
+                    "units": {
+                        "USD": [
+                            {"val": val, "fy": 2023, "fp": "FY", "form": form, "filed": filed,
+                             "start": "2023-01-01", "end": "2023-12-31", "accn": accn, "frame": "CY2023"}
+                            for val, accn, filed, form in items
+                        ]
+                    }
+                }
+            }
+        }
+    }
+
+
+class TestDeltaRefresh(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = mock.patch.object(sec_ingest, "CACHE_DIR", Path(self.tmp.name))
+        self.cache.start()
+        self.store = FactsStore(":memory:")
+
+    def tearDown(self):
+        self.store.close()
+        self.cache.stop()
+        self.tmp.cleanup()
+
+    def test_only_new_accessions_are_applied(self):
+        first = _payload((100.0, "0001-23-000001", "2024-02-01", "10-K"))
+        delta = refresh_company_facts("0000000001", self.store, payload=first)
+        self.assertEqual(delta.new_facts, 1)
+        version = self.store.company_version("0000000001")
+
+        self.assertFalse(refresh_company_facts("0000000001", self.store, payload=first).changed)
+        self.assertEqual(self.store.company_version("0000000001"), version)
+
+        amended = _payload(
+            (100.0, "0001-23-000001", "2024-02-01", "10-K"),
+            (105.0, "0001-24-000009", "2024-06-01", "10-K/A"),
+        )
+        delta = refresh_company_facts("0000000001", self.store, payload=amended)
+        self.assertEqual(delta.new_accessions, ["0001-24-000009"])
+        self.assertEqual(delta.amended_facts, 1)
+        self.assertEqual(len(self.store.load_company("0000000001")), 2)
+        self.assertGreater(self.store.company_version("0000000001"), version)
+
+    def test_facts_without_accession_are_not_reapplied(self):
+        payload = _payload((100.0, None, "2024-02-01", "10-K"))
+        self.assertEqual(refresh_company_facts("0000000001", self.store, payload=payload).new_facts, 1)
+        version = self.store.company_version("0000000001")
+        for _ in range(2):
+            self.assertFalse(refresh_company_facts("0000000001", self.store, payload=payload).changed)
+        self.assertEqual(len(self.store.load_company("0000000001")), 1)
+        self.assertEqual(self.store.company_version("0000000001"), version)
+
+    def test_unchanged_comparatives_are_not_amendments(self):
+        refresh_company_facts("0000000001", self.store, payload=_payload((100.0, "a", "2024-02-01", "10-K")))
+        delta = refresh_company_facts(
+            "0000000001", self.store, payload=_payload((100.0, "a", "2024-02-01", "10-K"), (100.0, "b", "2025-02-01", "10-K"))
+        )
+        self.assertEqual((delta.new_facts, delta.amended_facts), (1, 0))
+
+    def test_filings_index_skips_fetch(self):
+        refresh_company_facts("0000000001", self.store, payload=_payload((1.0, "a", "2024-01-01", "10-K")))
+        index = pd.DataFrame({"cik": ["0000000001"], "accn": ["a"]})
+        with mock.patch.object(sec_ingest, "_get_json", side_effect=AssertionError("fetched")):
+            delta = refresh_company_facts("0000000001", self.store, filings_index=index)
+        self.assertFalse(delta.fetched)
+
+
+if __name__ == "__main__":
+    unittest.main()
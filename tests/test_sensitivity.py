@@ -1,6 +1,8 @@
 import unittest
 
-from sensitivity import dcf_sensitivity
+import numpy as np
+
+from sensitivity import dcf_sensitivity, dcf_sensitivity_adaptive
 from valuation_dcf import DCFInputs
 
 
@@ -12,6 +14,29 @@ class TestSensitivity(unittest.TestCase):
         self.assertEqual(len(grid.y_values), 5)
         self.assertEqual(grid.grid.shape, (5, 5))
 
+    def test_adaptive_matches_dense_with_fewer_evaluations(self):
+        inputs = DCFInputs(ufcf=[100, 110, 120], wacc=0.1, terminal_method="perpetuity", terminal_value=130, debt=0, cash=0, shares=1)
+        adaptive = dcf_sensitivity_adaptive(inputs, (0.06, 0.12), (0.0, 0.05), "perpetuity", dense_size=33)
+        exact = dcf_sensitivity(inputs, (0.06, 0.12), (0.0, 0.05), 33, "perpetuity").grid
+        self.assertLess(adaptive.evaluations, exact.size // 4)
+        np.testing.assert_allclose(adaptive.dense.grid, exact, rtol=0.05)
+
+    def test_adaptive_near_wacc_equal_growth(self):
+        inputs = DCFInputs(ufcf=[100, 110, 120], wacc=0.1, terminal_method="perpetuity", terminal_value=130, debt=0, cash=0, shares=1)
+        adaptive = dcf_sensitivity_adaptive(inputs, (0.02, 0.12), (0.0, 0.06), "perpetuity", dense_size=41)
+        exact = dcf_sensitivity(inputs, (0.02, 0.12), (0.0, 0.06), 41, "perpetuity").grid
+        self.assertLess(adaptive.evaluations, exact.size // 2)
+        finite = np.isfinite(exact)
+        np.testing.assert_array_equal(np.isfinite(adaptive.dense.grid), finite)
+        np.testing.assert_allclose(adaptive.dense.grid[finite], exact[finite], rtol=0.02)
+
+    def test_adaptive_refines_around_target(self):
+        inputs = DCFInputs(ufcf=[100, 110], wacc=0.1, terminal_method="exit_multiple", terminal_value=100, debt=0, cash=0, shares=1)
+        plain = dcf_sensitivity_adaptive(inputs, (0.08, 0.12), (8, 12), "exit_multiple")
+        targeted = dcf_sensitivity_adaptive(inputs, (0.08, 0.12), (8, 12), "exit_multiple", target=1000)
+        self.assertGreater(targeted.evaluations, plain.evaluations)
+        self.assertEqual(len(targeted.x), targeted.evaluations)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import time
+import unittest
+
+from sample_generator import generate_synthetic_statements
+from service import ValuationService, fetch_json, load_test, start_server
+
+
+def _loader(ticker):
+    if ticker == "MISSING":
+        raise LookupError(f"Ticker {ticker} not found in SEC mapping.")
+    return {"cik": "1", "ticker": ticker, "name": ticker}, generate_synthetic_statements([2020, 2021, 2022, 2023])
+
+
+def _slow_loader(ticker):
+    time.sleep(0.2)
+    return _loader(ticker)
+
+
+async def _with_server(service, scenario):
+    server = await start_server(service, port=0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(port)
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.stop()
+
+
+class TestService(unittest.TestCase):
+    def test_batched_valuations(self):
+        async def scenario(port):
+            status, body = await fetch_json("127.0.0.1", port, "/valuation?ticker=abc&wacc=0.09")
+            self.assertEqual(status, 200)
+            self.assertEqual(body["ticker"], "ABC")
+            self.assertEqual(len(body["sensitivity"]["share_price"]), 7)
+            status, _ = await fetch_json("127.0.0.1", port, "/valuation?ticker=MISSING")
+            self.assertEqual(status, 400)
+            return await load_test("127.0.0.1", port, ["AAA", "BBB"], requests=60, concurrency=20)
+
+        report = asyncio.run(_with_server(ValuationService(loader=_loader, max_wait_ms=10), scenario))
+        self.assertEqual(report["statuses"], {200: 60})
+        self.assertLess(report["server"]["batches"], 62)
+        self.assertGreater(report["server"]["mean_batch_size"], 1.0)
+
+    def test_back_pressure(self):
+        async def scenario(port):
+            results = await asyncio.gather(*(fetch_json("127.0.0.1", port, "/valuation?ticker=X") for _ in range(8)))
+            return [status for status, _ in results]
+
+        service = ValuationService(loader=_slow_loader, max_batch=1, max_wait_ms=0, max_queue=1)
+        statuses = asyncio.run(_with_server(service, scenario))
+        self.assertIn(503, statuses)
+        self.assertIn(200, statuses)
+
+    def test_cold_ticker_does_not_block_warm_requests(self):
+        def loader(ticker):
+            if ticker == "COLD":
+                time.sleep(1.0)
+            return _loader(ticker)
+
+        async def scenario(port):
+            await fetch_json("127.0.0.1", port, "/valuation?ticker=WARM")
+
+            async def timed(ticker):
+                started = time.perf_counter()
+                status, _ = await fetch_json("127.0.0.1", port, f"/valuation?ticker={ticker}")
+                return status, time.perf_counter() - started
+
+            cold = asyncio.ensure_future(timed("COLD"))
+            await asyncio.sleep(0.05)
+            warm = await timed("WARM")
+            return warm, await cold
+
+        (warm_status, warm_s), (cold_status, cold_s) = asyncio.run(_with_server(ValuationService(loader=loader), scenario))
+        self.assertEqual((warm_status, cold_status), (200, 200))
+        self.assertLess(warm_s, cold_s / 2)
+
+    def test_statements_reload_and_caches_are_bounded(self):
+        loads = []
+        versions = {"A": 1}
+
+        def loader(ticker):
+            loads.append(ticker)
+            return _loader(ticker)
+
+        service = ValuationService(
+            loader=loader, version=lambda company: versions.get(company["ticker"]), reload_check_seconds=0.0,
+            max_statements=2, max_forecasts=3,
+        )
+
+        async def scenario(port):
+            await fetch_json("127.0.0.1", port, "/valuation?ticker=A")
+            await fetch_json("127.0.0.1", port, "/valuation?ticker=A")
+            versions["A"] = 2
+            await fetch_json("127.0.0.1", port, "/valuation?ticker=A")
+            for ticker, growth in (("B", 0.01), ("C", 0.02), ("C", 0.03)):
+                status, _ = await fetch_json("127.0.0.1", port, f"/valuation?ticker={ticker}&growth={growth}")
+                self.assertEqual(status, 200)
+
+        asyncio.run(_with_server(service, scenario))
+        self.assertEqual(loads, ["A", "A", "B", "C"])
+        self.assertEqual(list(service._statements), ["B", "C"])
+        self.assertEqual(len(service._ufcf), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
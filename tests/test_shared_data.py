@@ -0,0 +1,112 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+import shared_data
+from facts_store import FactsStore
+
+
+class TestSharedData(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        shared_data.detach_all()
+
+    def tearDown(self):
+        shared_data.detach_all()
+        self.tmp.cleanup()
+
+    def test_ticker_table_attach_and_search(self):
+        mapping = pd.DataFrame({"ticker": ["AAPL", "AAP", "MSFT"], "cik": ["1", "2", "3"], "title": ["A", "B", "C"]})
+        shared_data.publish_ticker_index(mapping, self.directory)
+        table = shared_data.attach(shared_data.TICKERS, self.directory)
+        self.assertIs(table, shared_data.attach(shared_data.TICKERS, self.directory))
+        matches = shared_data.search_ticker_table(table, "aap")
+        self.assertEqual([m.ticker for m in matches], ["AAPL", "AAP"])
+
+    def test_exact_ticker_lookup(self):
+        tickers = [f"A{i:02d}" for i in range(30)] + ["A"]
+        mapping = pd.DataFrame({"ticker": tickers, "cik": [str(i) for i in range(31)], "title": tickers})
+        shared_data.publish_ticker_index(mapping, self.directory)
+        table = shared_data.attach(shared_data.TICKERS, self.directory)
+        self.assertEqual(shared_data.find_ticker(table, "a").cik, "30")
+        self.assertIsNone(shared_data.find_ticker(table, "ZZZ"))
+
+    def test_normalized_facts_reload_on_change(self):
+        store = FactsStore(":memory:")
+        flat = pd.DataFrame([{"taxonomy": "us-gaap", "tag": "Revenues", "unit": "USD", "value": 10.0, "fy": 2023,
+                              "accn": "a", "filed": "2024-01-01"}])
+        store.replace_company("1", flat)
+        self.assertTrue(shared_data.refresh_normalized_facts(store, self.directory))
+        self.assertFalse(shared_data.refresh_normalized_facts(store, self.directory))
+        first = shared_data.shared_company_facts("1", self.directory)
+        self.assertEqual(first["value"].tolist(), [10.0])
+
+        store.insert_facts("1", flat.assign(value=12.0, fy=2024, accn="b"))
+        self.assertTrue(shared_data.refresh_normalized_facts(store, self.directory))
+        self.assertEqual(sorted(shared_data.shared_company_facts("1", self.directory)["value"]), [10.0, 12.0])
+        self.assertIsNone(shared_data.shared_company_facts("2", self.directory))
+
+    def test_first_load_is_published_for_later_sessions(self):
+        store = FactsStore(":memory:")
+        flat = pd.DataFrame([{"taxonomy": "us-gaap", "tag": "Revenues", "unit": "USD", "value": 10.0, "fy": 2023,
+                              "accn": "a", "filed": "2024-01-01"}])
+        store.replace_company("1", flat)
+        shared_data.refresh_normalized_facts(store, self.directory)
+        store.replace_company("2", flat.assign(value=20.0))
+
+        first_partition = shared_data.read_manifest(self.directory)[shared_data.NORMALIZED_FACTS]["partitions"]["1"]
+        # A cold company publishes only its own partition, without scanning the store.
+        with mock.patch("sec_ingest.fetch_company_facts", side_effect=AssertionError("stored company refetched")), \
+                mock.patch.object(store, "company_versions", side_effect=AssertionError("scanned every company")):
+            facts = shared_data.load_shared_company_facts("2", store, self.directory)
+        self.assertEqual(facts["value"].tolist(), [20.0])
+        self.assertNotIn("cik", facts.columns)
+        self.assertEqual(shared_data.shared_company_facts("1", self.directory)["value"].tolist(), [10.0])
+        manifest = shared_data.read_manifest(self.directory)
+        self.assertEqual(manifest[shared_data.NORMALIZED_FACTS]["partitions"]["1"], first_partition)
+        self.assertEqual(shared_data.partition_versions(shared_data.NORMALIZED_FACTS, self.directory), {"1": 1, "2": 1})
+        self.assertFalse(shared_data.refresh_normalized_facts(store, self.directory))
+
+    def test_removed_companies_are_dropped(self):
+        store = FactsStore(":memory:")
+        flat = pd.DataFrame([{"taxonomy": "us-gaap", "tag": "Revenues", "unit": "USD", "value": 10.0, "fy": 2023,
+                              "accn": "a", "filed": "2024-01-01"}])
+        for cik in ("1", "2"):
+            store.replace_company(cik, flat)
+        shared_data.publish_normalized_facts(store, self.directory)
+        other = FactsStore(":memory:")
+        other.replace_company("1", flat)
+        self.assertTrue(shared_data.refresh_normalized_facts(other, self.directory))
+        self.assertIsNone(shared_data.shared_company_facts("2", self.directory))
+        self.assertEqual(list((self.directory / shared_data.NORMALIZED_FACTS).glob("2.*.arrow")), [])
+
+    def test_stale_ticker_table_is_reloaded(self):
+        old = pd.DataFrame({"ticker": ["AAPL"], "cik": ["1"], "title": ["A"]})
+        new = pd.DataFrame({"ticker": ["AAPL", "MSFT"], "cik": ["1", "3"], "title": ["A", "C"]})
+        with mock.patch("sec_ingest.load_ticker_cik_mapping", return_value=old):
+            self.assertEqual(shared_data.shared_ticker_table(self.directory).num_rows, 1)
+        with mock.patch("sec_ingest.load_ticker_cik_mapping", return_value=new) as load:
+            self.assertEqual(shared_data.shared_ticker_table(self.directory).num_rows, 1)
+            load.assert_not_called()
+            self.assertEqual(shared_data.shared_ticker_table(self.directory, max_age=0).num_rows, 2)
+            load.assert_called_once_with(force_refresh=True)
+
+    def test_concurrent_publishers_get_distinct_generations(self):
+        df = pd.DataFrame({"x": range(1000)})
+        threads = [threading.Thread(target=shared_data.publish, args=("data", df, self.directory)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(shared_data.read_manifest(self.directory)["data"]["generation"], 4)
+        self.assertEqual(shared_data.attach("data", self.directory).num_rows, 1000)
+        self.assertEqual(list(self.directory.glob("*.tmp")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
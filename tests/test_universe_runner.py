@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+from facts_store import FactsStore
+from universe_runner import default_loader, read_spilled, run_universe
+
+
+def _loader(cik):
+    if cik == "bad":
+        raise LookupError("no facts")
+    rows = []
+    for year in range(2019, 2024):
+        revenue = 100.0 * (year - 2018)
+        for tag, value in (("Revenues", revenue), ("OperatingIncomeLoss", revenue * 0.2),
+                           ("DepreciationDepletionAndAmortization", revenue * 0.05),
+                           ("PaymentsToAcquirePropertyPlantAndEquipment", revenue * 0.04)):
+            rows.append({"taxonomy": "us-gaap", "tag": tag, "unit": "USD", "value": value, "fy": year, "accn": cik})
+    return pd.DataFrame(rows)
+
+
+class TestUniverseRunner(unittest.TestCase):
+    def test_chunked_run_spills_every_company(self):
+        ciks = [f"{i:010d}" for i in range(12)] + ["bad"]
+        with tempfile.TemporaryDirectory() as tmp:
+            report = run_universe(
+                ciks,
+                [2024, 2025],
+                {"revenue_growth": {"path": [0.05, 0.05]}},
+                memory_budget_mb=0.05,
+                spill_dir=Path(tmp),
+                loader=_loader,
+            )
+            forecast = read_spilled(report.spill_dir, "forecast")
+            ufcf = read_spilled(report.spill_dir, "ufcf")
+            second = run_universe(ciks[:1], [2024], {}, spill_dir=Path(tmp), loader=_loader)
+            rerun = read_spilled(second.spill_dir, "forecast")
+
+        self.assertEqual(report.succeeded, 12)
+        self.assertEqual(list(report.failed), ["bad"])
+        self.assertGreater(report.chunks, 2)
+        self.assertEqual(sum(report.chunk_sizes), len(ciks))
+        self.assertGreater(report.peak_rss_mb, 0)
+        self.assertEqual(len(report.chunk_rss_mb), report.chunks)
+        self.assertEqual(forecast["cik"].nunique(), 12)
+        self.assertEqual(len(ufcf), 24)
+        self.assertNotEqual(second.spill_dir, report.spill_dir)
+        self.assertEqual(rerun["cik"].unique().tolist(), [ciks[0]])
+
+    def test_default_loader_persists_only_when_asked(self):
+        payload = {"facts": {"us-gaap": {"Revenues": {"units": {"USD": [{"val": 1.0, "fy": 2023, "accn": "a"}]}}}}}
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("sec_ingest.fetch_company_facts", return_value=payload) as fetch:
+            path = Path(tmp) / "facts.sqlite"
+            with default_loader(store_path=path) as load:
+                self.assertEqual(len(load("1")), 1)
+            self.assertFalse(path.exists())
+
+            with default_loader(persist_facts=True, store_path=path) as load:
+                load("1")
+            with FactsStore(path) as store:
+                self.assertEqual(store.companies(), ["1"])
+
+            with default_loader(store_path=path) as load:
+                load("1")
+                load("2")
+            with FactsStore(path) as store:
+                self.assertEqual(store.companies(), ["1"])
+            self.assertEqual(fetch.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
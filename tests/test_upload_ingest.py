@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from openpyxl import Workbook
+
+from upload_ingest import ingest_workbook
+
+
+class TestUploadIngest(unittest.TestCase):
+    def test_wide_and_long_sheets(self):
+        workbook = Workbook()
+        wide = workbook.active
+        wide.title = "Income Statement"
+        wide.append(["Acme Corp"])
+        wide.append(["(USD in millions)"])
+        wide.append(["Line item", "FY2022", "FY2023"])
+        wide.append(["Net sales", "1,000", "1,200"])
+        wide.append(["Cost of goods sold", "(400)", 450])
+        wide.append(["Memo: headcount", 10, 12])
+        long = workbook.create_sheet("Balance Sheet")
+        long.append(["statement", "line_item", "year", "value"])
+        long.append(["BS", "Total assets", 2023, 5000])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "historicals.xlsx"
+            workbook.save(path)
+            df = ingest_workbook(str(path))
+
+        values = df.set_index(["line_item", "year"])["value"]
+        self.assertEqual(values[("Revenue", 2023)], 1_200_000_000.0)
+        self.assertEqual(values[("Cost of revenue", 2022)], -400_000_000.0)
+        self.assertEqual(values[("Total assets", 2023)], 5000.0)
+        self.assertEqual(len(df), 5)
+        self.assertEqual(set(df["statement"]), {"IS", "BS"})
+
+    def test_margin_rows_and_currency_negatives(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["$ in thousands"])
+        sheet.append(["Line item", "FY2022", "FY2023"])
+        sheet.append(["Revenue", "$900", "$1,000"])
+        sheet.append(["Gross margin", 0.38, 0.40])
+        sheet.append(["Gross profit", 342, 400])
+        sheet.append(["Net income", "$20", "$(50)"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "historicals.xlsx"
+            workbook.save(path)
+            df = ingest_workbook(str(path))
+
+        values = df.set_index(["line_item", "year"])["value"]
+        self.assertEqual(values[("Gross profit", 2023)], 400_000.0)
+        self.assertEqual(values[("Net income", 2023)], -50_000.0)
+
+    def test_quarter_columns_are_skipped(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["USD in millions"])
+        sheet.append(["Line item", "Q1 2023", "Q2 2023", "Q3 2023", "Q4 2023", "FY2023", "1H 2024", "FY2024", "LTM 2024"])
+        sheet.append(["Revenue", 10, 20, 30, 40, 100, 55, 120, 125])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "historicals.xlsx"
+            workbook.save(path)
+            df = ingest_workbook(str(path))
+
+        values = df.set_index(["line_item", "year"])["value"]
+        self.assertEqual(values.to_dict(), {("Revenue", 2023): 100_000_000.0, ("Revenue", 2024): 120_000_000.0})
+
+    def test_ambiguous_duplicate_years_are_rejected(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Line item", "Mar-2023", "Dec-2023", "Dec-2024"])
+        sheet.append(["Revenue", 25, 100, 120])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "historicals.xlsx"
+            workbook.save(path)
+            with self.assertRaisesRegex(ValueError, "same year"):
+                ingest_workbook(str(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
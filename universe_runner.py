@@ -0,0 +1,272 @@
+"""Memory-budgeted flatten -> normalize -> forecast runs over many companies.
+
+Companies are processed in chunks sized from the measured per-company
+footprint so in-flight frames stay inside ``memory_budget_mb``. Each chunk's
+results are spilled to Parquet under a fresh per-run directory and released
+before the next chunk starts.
+
+By default facts are read from the local facts store when it already holds a
+company and downloaded otherwise (the SEC JSON cache under ``.cache`` still
+applies); downloaded companies are written to the store only with
+``persist_facts=True`` (``--persist-facts``).
+
+    python universe_runner.py CIK [CIK ...] --budget-mb 512 --spill-dir .cache/universe
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from forecast import build_ufcf, forecast_statements, next_forecast_years
+from normalize import canonicalize_long_format, map_facts_to_statements
+
+SPILL_TABLES = ("historicals", "forecast", "ufcf")
+
+# Fraction of the budget planned for frames; the rest absorbs pandas temporaries.
+BUDGET_HEADROOM = 0.5
+
+
+@dataclass
+class UniverseRunReport:
+    companies: int
+    succeeded: int
+    failed: Dict[str, str]
+    chunks: int
+    chunk_sizes: List[int]
+    per_company_mb: float
+    peak_rss_mb: float
+    elapsed_s: float
+    spill_dir: Path
+    # Resident set size after each chunk was spilled and released (current, not peak).
+    chunk_rss_mb: List[float] = field(default_factory=list)
+
+
+def peak_rss_mb() -> float:
+    """Process-lifetime peak resident set size in MB (NaN where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """Current resident set size of this process in MB (NaN where ``/proc`` is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return float("nan")
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def new_run_dir(spill_root: Path) -> Path:
+    """Fresh directory for one run's chunks, so runs never read each other's spills."""
+    run_dir = spill_root / f"run-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    run_dir.mkdir(parents=True)
+    return run_dir
+
+
+def frame_bytes(*frames: pd.DataFrame) -> int:
+    return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+
+@contextmanager
+def default_loader(persist_facts: bool = False, store_path: Optional[Path] = None) -> Iterator[Callable[[str], pd.DataFrame]]:
+    """Facts loader backed by the local facts store, closed when the context exits.
+
+    Companies already in the store are read from it. Others are downloaded and,
+    only when ``persist_facts`` is set, written to the store; otherwise a store
+    that does not exist yet is not created.
+    """
+    from facts_store import FactsStore, default_store_path
+    from sec_ingest import fetch_company_facts, flatten_company_facts, load_company_facts_frame
+
+    path = Path(store_path) if store_path is not None else default_store_path()
+    if not persist_facts and not path.exists():
+        yield lambda cik: flatten_company_facts(fetch_company_facts(cik))
+        return
+    store = FactsStore(path)
+
+    def read_only(cik: str) -> pd.DataFrame:
+        if store.has_company(cik):
+            return store.load_company(cik)
+        return flatten_company_facts(fetch_company_facts(cik))
+
+    try:
+        yield (lambda cik: load_company_facts_frame(cik, store)) if persist_facts else read_only
+    finally:
+        store.close()
+
+
+def process_company(
+    cik: str,
+    loader: Callable[[str], pd.DataFrame],
+    forecast_years: Union[int, List[int]],
+    assumptions: Dict[str, dict],
+    tax_rate: float,
+) -> Tuple[Dict[str, pd.DataFrame], int]:
+    """Pipeline outputs for one company and its footprint (input facts plus outputs) in bytes.
+
+    An integer ``forecast_years`` forecasts that many years after the company's
+    last historical year.
+    """
+    flat = loader(cik)
+    flat_bytes = frame_bytes(flat)
+    historicals = canonicalize_long_format(map_facts_to_statements(flat))
+    del flat
+    if isinstance(forecast_years, int):
+        forecast_years = next_forecast_years(historicals, forecast_years)
+    result = forecast_statements(historicals, forecast_years, assumptions)
+    ufcf = build_ufcf(result.forecast, tax_rate).rename_axis("year").reset_index()
+    outputs = {
+        "historicals": historicals.assign(cik=cik),
+        "forecast": result.forecast.assign(cik=cik),
+        "ufcf": ufcf.assign(cik=cik),
+    }
+    return outputs, flat_bytes + frame_bytes(*outputs.values())
+
+
+def _spill(outputs: Dict[str, List[pd.DataFrame]], directory: Path) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in SPILL_TABLES:
+        if outputs[name]:
+            df = pd.concat(outputs[name], ignore_index=True)
+            df.to_parquet(directory / f"{name}.parquet", index=False)
+
+
+def run_universe(
+    ciks: Iterable[str],
+    forecast_years: Union[int, List[int]],
+    assumptions: Dict[str, dict],
+    memory_budget_mb: float = 512.0,
+    spill_dir: Optional[Path] = None,
+    loader: Optional[Callable[[str], pd.DataFrame]] = None,
+    tax_rate: float = 0.21,
+    persist_facts: bool = False,
+) -> UniverseRunReport:
+    """Run the pipeline for every cik within ``memory_budget_mb`` of in-flight frames.
+
+    The first company is a probe that measures the per-company footprint
+    (input facts plus output frames); later chunk sizes use the largest
+    footprint seen so far. Chunks are written to a new run directory under
+    ``spill_dir`` (``report.spill_dir``). The process peak RSS and the current
+    RSS after each chunk are reported. Failures are recorded per company and
+    do not stop the run. ``forecast_years`` is a list of calendar years, or a
+    count of years after each company's last historical year. Without a
+    ``loader`` the facts store is used as described in the module docstring
+    and closed when the run ends.
+    """
+    with ExitStack() as stack:
+        if loader is None:
+            loader = stack.enter_context(default_loader(persist_facts))
+        return _run_chunks(list(ciks), forecast_years, assumptions, memory_budget_mb, spill_dir, loader, tax_rate)
+
+
+def _run_chunks(
+    ciks: List[str],
+    forecast_years: Union[int, List[int]],
+    assumptions: Dict[str, dict],
+    memory_budget_mb: float,
+    spill_dir: Optional[Path],
+    loader: Callable[[str], pd.DataFrame],
+    tax_rate: float,
+) -> UniverseRunReport:
+    spill_dir = new_run_dir(Path(spill_dir or Path(".cache") / "universe"))
+    budget_bytes = memory_budget_mb * 1024 * 1024 * BUDGET_HEADROOM
+    started = time.perf_counter()
+
+    failed: Dict[str, str] = {}
+    chunk_sizes: List[int] = []
+    chunk_rss: List[float] = []
+    per_company = 0.0
+    succeeded = 0
+    position = 0
+    chunk_index = 0
+    while position < len(ciks):
+        chunk_size = 1 if per_company == 0 else max(1, int(budget_bytes // per_company))
+        chunk = ciks[position : position + chunk_size]
+        outputs: Dict[str, List[pd.DataFrame]] = {name: [] for name in SPILL_TABLES}
+        for cik in chunk:
+            try:
+                result, footprint = process_company(cik, loader, forecast_years, assumptions, tax_rate)
+            except Exception as exc:
+                failed[cik] = f"{type(exc).__name__}: {exc}"
+                continue
+            per_company = max(per_company, float(footprint))
+            for name, df in result.items():
+                outputs[name].append(df)
+            succeeded += 1
+        _spill(outputs, spill_dir / f"chunk_{chunk_index:05d}")
+        del outputs
+        gc.collect()
+        chunk_sizes.append(len(chunk))
+        chunk_rss.append(current_rss_mb())
+        position += len(chunk)
+        chunk_index += 1
+
+    return UniverseRunReport(
+        companies=len(ciks),
+        succeeded=succeeded,
+        failed=failed,
+        chunks=chunk_index,
+        chunk_sizes=chunk_sizes,
+        per_company_mb=per_company / (1024 * 1024),
+        peak_rss_mb=peak_rss_mb(),
+        elapsed_s=time.perf_counter() - started,
+        spill_dir=spill_dir,
+        chunk_rss_mb=chunk_rss,
+    )
+
+
+def read_spilled(spill_dir: Path, name: str) -> pd.DataFrame:
+    """Concatenate one spilled table (``historicals``, ``forecast`` or ``ufcf``) across a run's chunks.
+
+    ``spill_dir`` is the run directory, ``UniverseRunReport.spill_dir``.
+    """
+    paths = sorted(Path(spill_dir).glob(f"chunk_*/{name}.parquet"))
+    if not paths:
+        return pd.DataFrame()
+    return pd.concat((pd.read_parquet(path) for path in paths), ignore_index=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory-budgeted universe forecast run.")
+    parser.add_argument("ciks", nargs="+")
+    parser.add_argument("--budget-mb", type=float, default=512.0)
+    parser.add_argument("--spill-dir", type=Path, default=Path(".cache") / "universe")
+    parser.add_argument("--first-year", type=int, default=None, help="default: each company's last reported year + 1")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--growth", type=float, default=0.06)
+    parser.add_argument("--persist-facts", action="store_true", help="store downloaded companies in the facts store")
+    args = parser.parse_args()
+
+    report = run_universe(
+        [cik.zfill(10) for cik in args.ciks],
+        args.years if args.first_year is None else list(range(args.first_year, args.first_year + args.years)),
+        {"revenue_growth": {"path": [args.growth] * args.years}},
+        memory_budget_mb=args.budget_mb,
+        spill_dir=args.spill_dir,
+        persist_facts=args.persist_facts,
+    )
+    print(f"companies={report.companies} succeeded={report.succeeded} failed={len(report.failed)}")
+    print(f"chunks={report.chunks} sizes={report.chunk_sizes} per_company_mb={report.per_company_mb:.2f}")
+    last_rss = report.chunk_rss_mb[-1] if report.chunk_rss_mb else float("nan")
+    print(f"process_peak_rss_mb={report.peak_rss_mb:.1f} rss_after_last_chunk_mb={last_rss:.1f}")
+    print(f"elapsed_s={report.elapsed_s:.1f} run_dir={report.spill_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Ingest uploaded historicals workbooks into the canonical long format."""
+from __future__ import annotations
+
+import re
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from normalize import STATEMENT_TAGS
+from parse import clean_label_series, detect_year_series, find_unit_scale, interim_period_mask, parse_numeric_series
+
+LONG_COLUMNS = ["statement", "line_item", "year", "value"]
+
+# Common analyst captions for the canonical line items, on top of the labels and
+# XBRL tags in STATEMENT_TAGS. Ratio captions such as "gross margin" are left out:
+# those rows usually hold percentages, not amounts.
+LABEL_ALIASES: Dict[str, List[str]] = {
+    "Revenue": ["revenues", "sales", "net sales", "total revenue", "total revenues", "turnover"],
+    "Cost of revenue": ["cost of sales", "cost of goods sold", "cogs", "cost of revenues"],
+    "Operating income": ["operating profit", "ebit", "income from operations"],
+    "Net income": ["net profit", "net earnings", "profit after tax"],
+    "Total assets": ["assets"],
+    "Total liabilities": ["liabilities"],
+    "Total equity": ["shareholders equity", "stockholders equity", "total shareholders equity"],
+    "Cash and equivalents": ["cash", "cash and cash equivalents"],
+    "Inventory": ["inventories"],
+    "Accounts receivable": ["receivables", "trade receivables"],
+    "Accounts payable": ["payables", "trade payables"],
+    "PP&E": ["property plant and equipment", "ppe", "net ppe"],
+    "Long-term debt": ["long term debt", "total debt"],
+    "Net cash from ops": ["cash from operations", "operating cash flow", "cfo"],
+    "Capex": ["capital expenditures", "capital expenditure"],
+    "D&A": ["depreciation and amortization", "depreciation amortization", "da"],
+}
+
+_HEADER_SCAN_ROWS = 25
+
+
+def label_key(label: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", label.lower()).strip()
+
+
+def _label_key_series(labels: pd.Series) -> pd.Series:
+    return clean_label_series(labels).str.lower().str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip()
+
+
+def build_label_index() -> Dict[str, Tuple[str, str]]:
+    """Normalized caption -> (statement, canonical line item)."""
+    index: Dict[str, Tuple[str, str]] = {}
+    statement_of = {}
+    for statement, tag_map in STATEMENT_TAGS.items():
+        for tag, line_item in tag_map.items():
+            statement_of[line_item] = statement
+            index[label_key(tag)] = (statement, line_item)
+            index[label_key(line_item)] = (statement, line_item)
+    for line_item, aliases in LABEL_ALIASES.items():
+        for alias in aliases:
+            index.setdefault(label_key(alias), (statement_of[line_item], line_item))
+    return index
+
+
+LABEL_INDEX = build_label_index()
+
+
+def iter_workbook_sheets(source: Union[str, BinaryIO]) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Yield ``(sheet name, raw cell frame)`` one sheet at a time from a read-only workbook."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            raw = pd.DataFrame(worksheet.iter_rows(values_only=True))
+            if not raw.empty:
+                yield worksheet.title, raw.dropna(how="all").dropna(axis=1, how="all").reset_index(drop=True)
+    finally:
+        workbook.close()
+
+
+def annual_year_series(labels: pd.Series) -> pd.Series:
+    """Fiscal year of each header cell; NA for non-year cells and quarter, half, LTM or CAGR columns."""
+    return detect_year_series(labels).mask(interim_period_mask(labels))
+
+
+def _find_header_row(raw: pd.DataFrame) -> Optional[int]:
+    head = raw.head(_HEADER_SCAN_ROWS)
+    years = head.apply(detect_year_series, axis=1)
+    year_counts = years.notna().sum(axis=1)
+    candidates = year_counts[year_counts >= 2]
+    return int(candidates.index[0]) if not candidates.empty else None
+
+
+def _long_sheet(sheet: str, raw: pd.DataFrame) -> Optional[pd.DataFrame]:
+    header = clean_label_series(raw.iloc[0]).str.lower()
+    if not set(LONG_COLUMNS).issubset(set(header.dropna())):
+        return None
+    df = raw.iloc[1:].set_axis(header.tolist(), axis=1)
+    df = df[LONG_COLUMNS].copy()
+    df["year"] = annual_year_series(df["year"])
+    df["value"] = parse_numeric_series(df["value"])
+    df = df.dropna(subset=["line_item", "year", "value"])
+    df["year"] = df["year"].astype(int)
+    df["source_sheet"] = sheet
+    df["source_label"] = df["line_item"]
+    return df
+
+
+def wide_sheet_to_long(sheet: str, raw: pd.DataFrame, label_index: Optional[Dict[str, Tuple[str, str]]] = None) -> pd.DataFrame:
+    """Convert one wide sheet (labels down, years across) to canonical long rows.
+
+    Only full-year columns are read; quarter, half, year-to-date, LTM and CAGR
+    columns are skipped. Raises ``ValueError`` when two remaining columns
+    resolve to the same year, rather than keeping one of them silently.
+    """
+    label_index = label_index or LABEL_INDEX
+    header_row = _find_header_row(raw)
+    if header_row is None:
+        return pd.DataFrame(columns=[*LONG_COLUMNS, "source_sheet", "source_label"])
+
+    header = raw.iloc[header_row]
+    label_column = next(col for col in raw.columns if col not in detect_year_series(header).dropna().index)
+    year_columns = annual_year_series(header).dropna()
+    repeated = year_columns[year_columns.duplicated(keep=False)]
+    if not repeated.empty:
+        cells = ", ".join(repr(str(cell)) for cell in header[repeated.index])
+        raise ValueError(f"Sheet {sheet!r} has several columns for the same year ({cells}); keep one column per fiscal year.")
+    if year_columns.empty:
+        return pd.DataFrame(columns=[*LONG_COLUMNS, "source_sheet", "source_label"])
+
+    preamble = raw.iloc[: header_row + 1].to_numpy().ravel().tolist()
+    scale = find_unit_scale([sheet, *preamble])
+
+    body = raw.iloc[header_row + 1 :]
+    labels = clean_label_series(body[label_column])
+    mapped = _label_key_series(body[label_column]).map(label_index)
+    keep = mapped.notna()
+    if not keep.any():
+        return pd.DataFrame(columns=[*LONG_COLUMNS, "source_sheet", "source_label"])
+
+    values = body.loc[keep, list(year_columns.index)]
+    values.columns = year_columns.astype(int).to_numpy()
+    long = values.reset_index(names="row").melt(id_vars="row", var_name="year", value_name="raw").set_index("row")
+    long["value"] = parse_numeric_series(long["raw"]) * scale
+    long = long.dropna(subset=["value"])
+
+    targets = mapped[keep]
+    long["statement"] = targets.loc[long.index].str[0].to_numpy()
+    long["line_item"] = targets.loc[long.index].str[1].to_numpy()
+    long["source_sheet"] = sheet
+    long["source_label"] = labels.loc[long.index].to_numpy()
+    return long[[*LONG_COLUMNS, "source_sheet", "source_label"]].reset_index(drop=True)
+
+
+def ingest_workbook(source: Union[str, BinaryIO]) -> pd.DataFrame:
+    """Canonical long frame from every sheet of an uploaded workbook.
+
+    Sheets that are already in long format (``statement``, ``line_item``,
+    ``year``, ``value`` columns) pass through; wide sheets are converted with
+    year and unit-scale detection. Only full-year periods are kept (see
+    ``wide_sheet_to_long``). The first sheet to provide a line item and year
+    wins.
+    """
+    frames = []
+    for sheet, raw in iter_workbook_sheets(source):
+        long = _long_sheet(sheet, raw)
+        frames.append(long if long is not None else wide_sheet_to_long(sheet, raw))
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=[*LONG_COLUMNS, "source_sheet", "source_label"])
+    df = pd.concat(frames, ignore_index=True)
+    df["year"] = df["year"].astype(int)
+    return df.drop_duplicates(["line_item", "year"], keep="first").reset_index(drop=True)
@@ -58,3 +58,40 @@ def terminal_value_perpetuity(ufcf_next: float, wacc: float, growth: float) -> f
     if wacc <= growth:
         return float("nan")
     return ufcf_next / (wacc - growth)
+
+
+def dcf_valuation_batch(
+    ufcf: np.ndarray,
+    wacc: np.ndarray,
+    terminal_value: np.ndarray,
+    debt: np.ndarray,
+    cash: np.ndarray,
+    shares: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Vectorized ``dcf_valuation``: ``ufcf`` is (n, years); the other inputs broadcast against (n,)."""
+    ufcf = np.atleast_2d(np.asarray(ufcf, dtype=float))
+    wacc = np.asarray(wacc, dtype=float)
+    periods = np.arange(1, ufcf.shape[-1] + 1)
+    factors = 1 / (1 + wacc[..., None]) ** periods
+    pv_ufcf = (ufcf * factors).sum(axis=-1)
+    pv_terminal = np.asarray(terminal_value, dtype=float) * factors[..., -1]
+    enterprise_value = pv_ufcf + pv_terminal
+    equity_value = enterprise_value - np.asarray(debt, dtype=float) + np.asarray(cash, dtype=float)
+    shares = np.asarray(shares, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share_price = np.where(shares != 0, equity_value / np.where(shares != 0, shares, 1.0), 0.0)
+    return {
+        "enterprise_value": enterprise_value,
+        "equity_value": equity_value,
+        "share_price": share_price,
+        "pv_ufcf": pv_ufcf,
+        "pv_terminal": pv_terminal,
+    }
+
+
+def terminal_value_perpetuity_batch(ufcf_next: np.ndarray, wacc: np.ndarray, growth: np.ndarray) -> np.ndarray:
+    wacc = np.asarray(wacc, dtype=float)
+    growth = np.asarray(growth, dtype=float)
+    spread = wacc - growth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(spread > 0, np.asarray(ufcf_next, dtype=float) / np.where(spread > 0, spread, 1.0), np.nan)